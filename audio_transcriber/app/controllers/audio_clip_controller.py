@@ -1,35 +1,35 @@
+import re
+import threading
 from app.models.audio_clip import AudioClip
+from app.models.clip_segment import ClipSegment
+from app.models.audio_clip_index import AudioClipIndex
+from app.models.clip_day_summary import ClipDaySummary
 from app.services.api_interface import ApiInterface
-from peewee import DoesNotExist
+from app.services.clip_uploader import ClipUploader
+from app.services.database_writer import DatabaseWriter
+from peewee import DoesNotExist, Tuple
 
 class AudioClipController:
     def __init__(self, current_user, view):
         self.current_user = current_user
         self.view = view
         self.current_date = None
+        self.known_dates = set()  # Dates already in the dates list
+        self.search_generation = 0  # Latest search, older ones stop at their next page
+        self.searching = False  # Search results on display instead of the current date
+        self.search_page_size = 100
         self.api_interface = ApiInterface()
+        self.clip_uploader = ClipUploader(self.api_interface)
+        self.database_writer = DatabaseWriter(on_committed=self.show_new_clips)
 
     def add_audio_clip(self, data):
-        """Add a new AudioClip to the database."""
-        try:
-            clip = AudioClip.create(
-                transcription=data["transcription"],
-                summary=data["summary"],
-                date=data["date"],
-                time_start=data["time_start"],
-                time_end=data["time_end"],
-                duration=data["duration"],
-                description=data["description"],
-                score=data["score"],
-                admin_user=data["admin_user"],
-                file_path=data["file_path"]
-            )
-            self.show_new_clip(clip.id)
-            self.api_interface.post_clip(clip)
-            return clip
-        except Exception as e:
-            print(f"Error adding audio clip: {e}")
-            return None
+        """Queue a new AudioClip, with its segments, for the database writer."""
+        self.database_writer.write(data)
+
+    def stop(self):
+        """Commit the clips still queued for the database, then post them."""
+        self.database_writer.stop()
+        self.clip_uploader.stop()
     
     def get_audio_clip(self, clip_id):
         """Retrieve an AudioClip by ID."""
@@ -39,6 +39,70 @@ class AudioClipController:
             print("AudioClip not found.")
             return None
     
+    def get_clip_segments(self, clip_id):
+        """Retrieve the segments of a clip ordered by start time."""
+        return list(
+            ClipSegment.select()
+            .where(ClipSegment.clip == clip_id)
+            .order_by(ClipSegment.start)
+        )
+
+    def get_segment_at(self, clip_id, seconds):
+        """Retrieve the segment of a clip playing at a given second, or the next one after it."""
+        try:
+            return (ClipSegment.select()
+                    .where(ClipSegment.clip == clip_id, ClipSegment.end > seconds)
+                    .order_by(ClipSegment.start)
+                    .get())
+        except DoesNotExist:
+            return None
+
+    def find_segments(self, query):
+        """Search segment texts, returning (clip, start seconds) pairs to seek playback to."""
+        segments = (ClipSegment.select(ClipSegment, AudioClip)
+                    .join(AudioClip)
+                    .where(AudioClip.admin_user == self.current_user,
+                           ClipSegment.text.contains(query))
+                    .order_by(AudioClip.date, AudioClip.time_start, ClipSegment.start))
+        return [(segment.clip, segment.start) for segment in segments]
+
+    def get_clips_page(self, date, before=None, limit=200):
+        """Retrieve a page of a date's clips as (transcription, time, key) tuples, newest first.
+
+        Pages are keyed on (time_start, id) of the last row of the previous page, so clips
+        added meanwhile don't shift them.
+        """
+        query = (AudioClip
+            .select(AudioClip.transcription, AudioClip.time_start, AudioClip.time_end, AudioClip.id)
+            .where(
+                AudioClip.admin_user == self.current_user,
+                AudioClip.date == date,
+                AudioClip.skipped == False
+            )
+            .order_by(AudioClip.time_start.desc(), AudioClip.id.desc())
+            .limit(limit)
+            .tuples())
+        if before is not None:
+            query = query.where(Tuple(AudioClip.time_start, AudioClip.id) < Tuple(*before))
+        return [
+            (transcription, f"{time_start.strftime('%H:%M:%S')} - {time_end.strftime('%H:%M:%S')}",
+             (time_start.strftime('%H:%M:%S'), clip_id))
+            for transcription, time_start, time_end, clip_id in query
+        ]
+
+    def get_clips_between(self, start, end):
+        """Retrieve the clips started in [start, end) epoch microseconds, across day boundaries."""
+        return list(
+            AudioClip.select()
+            .where(
+                AudioClip.admin_user == self.current_user,
+                AudioClip.started_at >= start,
+                AudioClip.started_at < end,
+                AudioClip.skipped == False
+            )
+            .order_by(AudioClip.started_at)
+        )
+
     def get_clips_by_date(self, date):
         """Retrieve all audio clips for a given date, ordered by start_time"""
         try:
@@ -46,7 +110,8 @@ class AudioClipController:
                 AudioClip.select()
                 .where(
                     AudioClip.admin_user == self.current_user, 
-                    AudioClip.date == date
+                    AudioClip.date == date,
+                    AudioClip.skipped == False
                 )
                 .order_by(AudioClip.time_start)
             )
@@ -57,7 +122,7 @@ class AudioClipController:
         """Remove an AudioClip from the database by ID"""
         try:
             clip = AudioClip.get(AudioClip.id == clip_id)
-            clip.delete_instance()
+            clip.delete_instance(recursive=True)  # Takes the segments along
             return True
         except DoesNotExist:
             print("AudioClip not found.")
@@ -65,25 +130,42 @@ class AudioClipController:
         
     def get_clips_dates(self):
         """Retrieve all dates of audio clips of the current user order by date."""
-        try:
-            query = (AudioClip
-                .select(AudioClip.date)
-                .where(AudioClip.admin_user == self.current_user)
-                .distinct()  # Ensure dates are unique
-                .order_by(AudioClip.date.desc()))
-            return [clip.date for clip in query]
-        except DoesNotExist:
-            print("AudioClip not found.")
-            return None
+        query = (ClipDaySummary
+            .select(ClipDaySummary.date)
+            .where(ClipDaySummary.admin_user == self.current_user)
+            .order_by(ClipDaySummary.date.desc()))
+        return [day.date for day in query]
+
+    def get_day_summaries(self):
+        """Retrieve the clip count, total duration and mean score of every date, newest first."""
+        return list(ClipDaySummary
+            .select()
+            .where(ClipDaySummary.admin_user == self.current_user)
+            .order_by(ClipDaySummary.date.desc()))
     
-    def search_clips(self, query):
-        """Search for audio clips by transcription."""
+    def search_clips(self, query, limit=200, offset=0):
+        """Search the transcriptions of every date, best matches first.
+
+        Each word of the query matches as a prefix, accents and case ignored, and every
+        clip carries a snippet of its transcription around the matches. Results are
+        paged with limit and offset, ties broken by id so pages don't overlap.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        term = " ".join(f'"{word}"*' for word in words)
         try:
-            clips = AudioClip.select().where(
-                AudioClip.admin_user == self.current_user,
-                AudioClip.transcription.contains(query),
-                AudioClip.date == self.current_date
-            )
+            clips = (AudioClip
+                .select(AudioClip, AudioClipIndex.transcription.snippet("[", "]", "…", 24).alias("snippet"))
+                .join(AudioClipIndex, on=(AudioClip.id == AudioClipIndex.rowid))
+                .where(
+                    AudioClipIndex.match(term),
+                    AudioClip.admin_user == self.current_user,
+                    AudioClip.skipped == False
+                )
+                .order_by(AudioClipIndex.bm25(), AudioClip.id)
+                .limit(limit)
+                .offset(offset))
             return list(clips)
         except DoesNotExist:
             print("AudioClip not found.")
@@ -101,33 +183,67 @@ class AudioClipController:
         self.view.clear_dates_list()
         """Add a list of dates to the view."""
         dates = self.get_clips_dates()
+        self.known_dates = set(dates)
         for date in dates:
             self.view.add_date(date)
 
     def show_transcriptions(self, date=None):
-        self.view.clear_transcription_table()
-        """Add a list of transcriptions for a given date to the view."""
+        """List the transcriptions of a date in the view, paged in as it scrolls."""
         if date is None:
-            date = self.get_clips_dates()[0]
+            dates = self.get_clips_dates()
+            date = dates[0] if dates else None
             self.view.update_header_label(date)
         self.current_date = date
-        clips = self.get_clips_by_date(date)
-        for clip in clips:
-            time = f"{clip.time_start.strftime('%H:%M:%S')} - {clip.time_end.strftime('%H:%M:%S')}"
-            self.view.add_transcription(clip.transcription, time)
+        # A new generation, so pages of searches still running can't replace the listing
+        self.search_generation += 1
+        self.searching = False
+        self.view.show_transcription_pages(lambda before, limit: self.get_clips_page(date, before, limit),
+                                           self.search_generation)
 
-    def show_new_clip(self, clip_id):
-        """Update the view when a new clip is added."""
-        self.show_clip_dates()
-        clip = self.get_audio_clip(clip_id)
-        time = f"{clip.time_start.strftime('%H:%M:%S')} - {clip.time_end.strftime('%H:%M:%S')}"
-        self.view.add_transcription(clip.transcription, time)
+    def show_new_clips(self, rows):
+        """Update the view with clips just committed by the database writer, without reading them back."""
+        for row in rows:
+            if row["skipped"]:
+                continue  # Kept as a record of the skip, there is nothing to show
+            if row["date"] not in self.known_dates:
+                self.known_dates.add(row["date"])
+                self.view.show_new_date(row["date"])
+            if not self.searching and (self.current_date is None or row["date"] == self.current_date):
+                self.view.show_new_transcription(row["transcription"],
+                                                 f"{row['time_start']} - {row['time_end']}")
+            self.clip_uploader.upload(row)
+
+    def show_partial_transcription(self, channel, text):
+        """Show the provisional transcription of a clip that is still open."""
+        self.view.show_partial_transcription(channel, text)
+
+    def clear_partial_transcription(self, channel):
+        """Remove the provisional transcription once the final one is stored."""
+        self.view.clear_partial_transcription(channel)
 
     def show_search_transcriptions(self, search_query):
-        """Display search results in the view."""
-        self.view.clear_transcription_table()
-        clips = self.search_clips(search_query)
-        for clip in clips:
-            time = f"{clip.time_start.strftime('%H:%M:%S')} - {clip.time_end.strftime('%H:%M:%S')}"
-            self.view.add_transcription(clip.transcription, time)
+        """Search on a worker thread, the results reach the view in pages, best match on top."""
+        if not search_query.strip():
+            self.show_transcriptions(self.current_date)  # Back to the selected date
+            return
+        self.search_generation += 1
+        self.searching = True
+        threading.Thread(target=self.run_search, args=(self.search_generation, search_query),
+                         daemon=True).start()
 
+    def run_search(self, generation, search_query):
+        """Run a search and send its results to the view page by page, unless a newer one started."""
+        start = 0
+        while generation == self.search_generation:  # Otherwise stale, a newer view replaces it
+            clips = self.search_clips(search_query, limit=self.search_page_size, offset=start) or []
+            if generation != self.search_generation:
+                return
+            rows = [
+                (clip.snippet,
+                 f"{clip.date} {clip.time_start.strftime('%H:%M:%S')} - {clip.time_end.strftime('%H:%M:%S')}")
+                for clip in clips
+            ]
+            self.view.show_search_page(generation, rows, start == 0)
+            if len(rows) < self.search_page_size:
+                return  # Last page
+            start += len(rows)
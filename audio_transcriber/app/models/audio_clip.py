@@ -1,4 +1,4 @@
-from peewee import Model, TextField, DateTimeField, TimeField, FloatField, ForeignKeyField
+from peewee import Model, TextField, CharField, BooleanField, BigIntegerField, DateTimeField, TimeField, FloatField, ForeignKeyField
 from .admin_user import AdminUser
 from data.database import db, initialize_db, close_db
 import pdb
@@ -6,7 +6,8 @@ import pdb
 class AudioClip(Model):
     transcription = TextField()
     summary = TextField(null=True)
-    date = DateTimeField()
+    started_at = BigIntegerField(null=True, index=True)  # Epoch microseconds (UTC) of the first sample
+    date = DateTimeField()  # Local "YYYY/mm/dd" of started_at, for the day listings
     time_start = TimeField()
     time_end = TimeField()
     duration = FloatField()
@@ -14,9 +15,16 @@ class AudioClip(Model):
     score = FloatField()
     admin_user = ForeignKeyField(AdminUser, backref='audio_clips')
     file_path = TextField()
+    channel = CharField(default="default")
+    tier = CharField(default="full")  # Model tier that produced the transcription, "draft", "full" or "skipped"
+    skipped = BooleanField(default=False)  # Not transcribed, the speech gate found too little speech
+    speech_ratio = FloatField(null=True)  # Share of the clip the speech gate found to be speech
 
     class Meta:
         database = db
+        indexes = (
+            (('admin_user', 'date', 'time_start'), False),  # Day listings, in time order
+        )
 
 if __name__ == '__main__':
     initialize_db()
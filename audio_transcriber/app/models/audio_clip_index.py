@@ -0,0 +1,15 @@
+from playhouse.sqlite_ext import FTS5Model, SearchField, RowIDField
+from data.database import db
+
+class AudioClipIndex(FTS5Model):
+    """Full-text index over the AudioClip transcriptions, kept in sync by triggers."""
+    rowid = RowIDField()  # AudioClip id
+    transcription = SearchField()
+
+    class Meta:
+        database = db
+        options = {
+            "content": "audioclip",  # External content, the text is only stored in AudioClip
+            "content_rowid": "id",
+            "tokenize": "unicode61 remove_diacritics 2",  # "canción" matches "cancion"
+        }
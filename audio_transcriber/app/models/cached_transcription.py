@@ -0,0 +1,14 @@
+from peewee import Model, BlobField, IntegerField, TextField, FloatField, CharField
+from data.database import cache_db
+
+class CachedTranscription(Model):
+    fingerprint = BlobField()  # Packed spectral fingerprint bits, one row per frame
+    frames = IntegerField()
+    transcription = TextField()
+    segments = TextField(default="[]")  # JSON list of the clip segments
+    score = FloatField()
+    tier = CharField(default="full")
+    used_at = FloatField()  # Last hit or insert time, for LRU eviction
+
+    class Meta:
+        database = cache_db
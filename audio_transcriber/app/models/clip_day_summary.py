@@ -0,0 +1,21 @@
+from peewee import Model, DateTimeField, IntegerField, FloatField, ForeignKeyField
+from .admin_user import AdminUser
+from data.database import db
+
+class ClipDaySummary(Model):
+    """Per user and day totals of the transcribed clips, kept up to date by triggers on audioclip."""
+    admin_user = ForeignKeyField(AdminUser, backref='clip_days')
+    date = DateTimeField()  # Same "YYYY/mm/dd" value as AudioClip.date
+    clip_count = IntegerField(default=0)
+    total_duration = FloatField(default=0.0)  # Seconds
+    total_score = FloatField(default=0.0)
+
+    @property
+    def mean_score(self):
+        return self.total_score / self.clip_count if self.clip_count else 0.0
+
+    class Meta:
+        database = db
+        indexes = (
+            (('admin_user', 'date'), True),
+        )
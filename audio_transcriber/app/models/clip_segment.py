@@ -0,0 +1,17 @@
+from peewee import Model, TextField, FloatField, ForeignKeyField
+from .audio_clip import AudioClip
+from data.database import db
+
+class ClipSegment(Model):
+    clip = ForeignKeyField(AudioClip, backref='segments', on_delete='CASCADE')
+    start = FloatField()  # Seconds from the start of the clip file
+    end = FloatField()
+    text = TextField()
+    avg_logprob = FloatField()
+    no_speech_prob = FloatField()
+
+    class Meta:
+        database = db
+        indexes = (
+            (('clip', 'start'), False),
+        )
@@ -25,10 +25,10 @@ class ApiInterface:
         }
         return clip_dict
 
-    def post_clip(self, clip):
+    def post_clip(self, clip, timeout=None):
         route = self.url + self.post_clips_endpoint
         clip_data = self.parse_clip(clip)
-        response = requests.post(route, json=clip_data)
+        response = requests.post(route, json=clip_data, timeout=timeout)
         print("Response", response.status_code, response.text)
         return response
     
@@ -44,7 +44,8 @@ class ApiInterface:
                 for clip in AudioClip.select()
                 .where(
                     AudioClip.admin_user == 1, 
-                    AudioClip.date == date
+                    AudioClip.date == date,
+                    AudioClip.skipped == False  # Nothing was transcribed
                 )
                 .order_by(AudioClip.time_start)
             ]
@@ -1,42 +1,125 @@
 import sounddevice as sd
+import numpy as np
 import queue
+import threading
+from .resampler import StreamingDecimator
+from .clock import now_us
 
 class AudioInput:
-    def __init__(self, device=None, channels=1, samplerate=44100, blocksize=1024, max_duration=60):
+    def __init__(self, device=None, channels=1, samplerate=16000, blocksize=512, max_duration=60,
+                 capture_samplerate=None):
         self.device = device
         self.channels = channels
-        self.samplerate = samplerate
+        self.samplerate = samplerate  # Rate of the blocks returned by read_block
         self.blocksize = blocksize
+        # Devices that can't capture at samplerate are decimated once, in-stream, from a multiple of it
+        self.capture_samplerate = samplerate if capture_samplerate is None else capture_samplerate
+        if self.capture_samplerate % samplerate != 0:
+            raise ValueError("capture_samplerate must be a multiple of samplerate.")
+        self.decimation = self.capture_samplerate // samplerate
+        self.capture_blocksize = blocksize * self.decimation
+        self.decimator = None
+        self.block_duration = blocksize / samplerate  # in seconds
         self.max_blocks = int((samplerate * max_duration) / blocksize)  # Max number of blocks for 1 minute
-        self.q = queue.Queue(maxsize=self.max_blocks)  # Limited to 1 minute of audio
+        # Preallocated ring of blocks written in place by the audio callback, limited to 1 minute of audio
+        self.ring = np.zeros((self.max_blocks, self.capture_blocksize, channels), dtype=np.float32)
+        self.block_times = np.zeros(self.max_blocks, dtype=np.int64)  # Capture time of each slot
+        self.last_block_time = None  # Epoch microseconds of the first sample of the last block read
+        self.write_seq = 0  # Blocks written by the callback, only the callback changes it
+        self.read_seq = 0  # Blocks consumed by read_block
+        self.block_ready = threading.Condition()  # Notified by the callback for each block written
+        self.max_adc_latency = 4 * self.block_duration  # Longest ADC latency trusted, in seconds
         self.stream = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the overrun, drop and jitter counters."""
+        self.overruns = 0  # Times the reader fell a full ring behind the callback
+        self.dropped_frames = 0  # Frames overwritten before they were read
+        self.input_overflows = 0  # Overflows reported by PortAudio
+        self.callbacks = 0
+        self.last_callback_time = None
+        self.total_jitter = 0.0
+        self.max_jitter = 0.0
 
     def _audio_callback(self, indata, frames, time, status):
-        if status:
-            print(f"Status: {status}")
-        
-        # Ensure we maintain only 1 minute of audio in the queue
-        if self.q.full():
-            try:
-                self.q.get_nowait()  # Remove oldest block if the queue is full
-            except queue.Empty:
-                pass  # Shouldn't happen but handle just in case
-        
-        self.q.put(indata.copy())  # Add the new block
+        if status.input_overflow:
+            self.input_overflows += 1
+
+        # Callback jitter is how far the interval between callbacks is from one block
+        if self.last_callback_time is not None:
+            jitter = abs(time.currentTime - self.last_callback_time - self.block_duration)
+            self.total_jitter += jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+        self.last_callback_time = time.currentTime
+        self.callbacks += 1
+
+        # Write the block in place, then publish it by advancing the sequence counter
+        slot = self.ring[self.write_seq % self.max_blocks]
+        slot[:frames] = indata
+        slot[frames:] = 0
+        # The ADC captured the first sample this long before the callback ran, ignored when the
+        # host API reports no ADC time or one that can't be right
+        latency = time.currentTime - time.inputBufferAdcTime
+        if time.inputBufferAdcTime <= 0 or time.currentTime <= 0 or not 0 <= latency <= self.max_adc_latency:
+            latency = 0.0
+        self.block_times[self.write_seq % self.max_blocks] = now_us() - int(latency * 1_000_000)
+        with self.block_ready:
+            self.write_seq += 1
+            self.block_ready.notify()
 
     def start_stream(self):
+        self.read_seq = self.write_seq  # Discard audio left over from a previous run
+        self.reset_stats()
+        if self.decimation > 1:
+            self.decimator = StreamingDecimator(self.decimation, self.channels)
         self.stream = sd.InputStream(
             device=self.device,
             channels=self.channels,
-            samplerate=self.samplerate,
-            blocksize=self.blocksize,
+            samplerate=self.capture_samplerate,
+            blocksize=self.capture_blocksize,
             callback=self._audio_callback
         )
+        # The first sample of a block is at most one block older than the stream's input latency
+        self.max_adc_latency = max(4 * self.block_duration, self.stream.latency + self.block_duration)
         self.stream.start()
 
-    def read_block(self):
-        """Get the next audio block from the queue."""
-        return self.q.get()
+    def read_block(self, timeout=None):
+        """Get the next audio block from the ring buffer.
+
+        Without decimation the returned block is a view into the ring, valid until
+        the callback wraps around to it again, so it must be consumed or copied
+        before then. Raises queue.Empty if no block arrives within timeout seconds.
+        """
+        with self.block_ready:
+            if not self.block_ready.wait_for(lambda: self.read_seq != self.write_seq, timeout):
+                raise queue.Empty
+
+        # Skip the blocks the callback overwrote, keeping clear of the slot it writes next
+        behind = self.write_seq - self.read_seq - (self.max_blocks - 1)
+        if behind > 0:
+            self.overruns += 1
+            self.dropped_frames += behind * self.capture_blocksize
+            self.read_seq += behind
+
+        block = self.ring[self.read_seq % self.max_blocks]
+        self.last_block_time = int(self.block_times[self.read_seq % self.max_blocks])
+        self.read_seq += 1
+        if self.decimator is not None:
+            return self.decimator.process(block)
+        return block
+
+    def get_stats(self):
+        """Return the capture health counters."""
+        return {
+            "callbacks": self.callbacks,
+            "backlog_blocks": self.write_seq - self.read_seq,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+            "input_overflows": self.input_overflows,
+            "mean_jitter": self.total_jitter / max(self.callbacks - 1, 1),
+            "max_jitter": self.max_jitter
+        }
 
     def stop_stream(self):
         if self.stream is not None:
@@ -54,13 +137,13 @@ if __name__ == "__main__":
 
     def update_plot(frame, audio_input, line):
         try:
-            block = audio_input.read_block()
+            block = audio_input.read_block(timeout=0)
             line.set_ydata(np.concatenate((line.get_ydata()[len(block):], block.flatten())))
         except queue.Empty:
             pass
         return line,
 
-    audio_input = AudioInput(blocksize=1024*3)
+    audio_input = AudioInput(blocksize=512*3)
     audio_input.start_stream()
 
     fig, ax = plt.subplots()
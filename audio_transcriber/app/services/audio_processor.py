@@ -1,71 +1,319 @@
 import threading
 import queue
+import time
 from .audio_input import AudioInput
 from .clip_divider import ClipDivider
 from .speech_2_text import Speech2Text
 
 class AudioProcessor:
     def __init__(self, audio_input, clip_divider, speech_to_text, user_controller, \
-                clip_controller):
-        self.audio_input = audio_input
-        self.clip_divider = clip_divider
+                clip_controller, batch_size=8, batch_timeout=0.25, transcription_pool=None, \
+                read_timeout=0.1, max_pending_clips=32, partial_transcriptions=False):
+        self.channels = []  # (audio_input, clip_divider) pairs sharing the transcription backend
+        self.processing_threads = []
+        self.transcription_thread = None
         self.speech_to_text = speech_to_text
-        self.running = False
+        self.running = False  # Capturing audio
+        self.transcribing = False  # Transcription thread accepting clips
         self.processed_files = set()
-        self.new_clip_paths = queue.Queue()
+        # Bounded so a transcriber that falls behind holds back the dividers
+        self.new_clips = queue.Queue(maxsize=max_pending_clips)
+        self.stopping_clips = queue.Queue()  # Clips closed while stopping, handed over without waiting
+        self.read_timeout = read_timeout  # Seconds a blocked read waits before checking for stop
+
+        # Provisional transcriptions of open clips, needs an in-process speech_to_text
+        self.partial_transcriptions = partial_transcriptions and speech_to_text is not None
+        self.partial_thread = None
+        self.partials_lock = threading.Lock()
+        self.partials_ready = threading.Event()
+        self.pending_partials = {}  # Latest partial clip waiting per channel
+        self.partial_texts = {}  # Committed segments per (channel, clip_id)
+        self.closed_clips = {}  # Latest closed clip_id per channel
+        self.displayed_partials = {}  # clip_id whose provisional text is shown per channel
+        self.streamed_segments = {}  # Segments decoded so far per (channel, clip_id) being transcribed
         self.clip_controller = clip_controller
         self.user_controller = user_controller
+        self.batch_size = batch_size  # Max clips transcribed together
+        self.batch_timeout = batch_timeout  # Seconds to wait for a batch to fill up
+        self.transcription_pool = transcription_pool  # Worker processes replacing speech_to_text
+        self.add_channel(audio_input, clip_divider)
+
+    def add_channel(self, audio_input, clip_divider):
+        """Add an input source with its own clip divider to the processor."""
+        self.channels.append((audio_input, clip_divider))
+        clip_divider.add_observer(self)
+
+    def update(self, clip):
+        """Add the new clip to the queue of clips to transcribe.
+
+        Partial clips only replace the previous partial of their channel. While the queue
+        is full the calling divider waits here, so its input falls behind and accounts
+        for the overrun instead of clips piling up in memory. Once stopping, clips are
+        handed over without waiting, so stop() never waits on the transcriber.
+        """
+        if clip.get("partial"):
+            if self.partial_transcriptions:
+                with self.partials_lock:
+                    self.pending_partials[clip["channel"]] = clip
+                self.partials_ready.set()
+            return
 
-    def update(self, clip_path):
-        """Add the new clip to the queue of clips to transcribe."""
-        self.new_clip_paths.put(clip_path)
+        with self.partials_lock:
+            # Partials of this clip are now stale, the final transcription replaces them
+            self.closed_clips[clip["channel"]] = clip["clip_id"]
+            pending = self.pending_partials.get(clip["channel"])
+            if pending is not None and pending["clip_id"] <= clip["clip_id"]:
+                del self.pending_partials[clip["channel"]]
+            self.partial_texts.pop((clip["channel"], clip["clip_id"]), None)
 
-    def process_audio(self):
-        """Continuously process audio blocks until stopped."""
+        warned = False
         while self.running:
             try:
-                block = self.audio_input.read_block()
-                self.clip_divider.add_block(block)
+                self.new_clips.put(clip, timeout=self.read_timeout)
+                return
+            except queue.Full:
+                if not warned:
+                    warned = True
+                    print("Transcription is falling behind, holding back the audio input.")
+                if self.transcription_thread is None or not self.transcription_thread.is_alive():
+                    print(f"Clip dropped, transcription is not running: {clip['file_path']}")
+                    return
+        # Stopping, the caller may be stop() draining the dividers, so it must not wait
+        try:
+            self.new_clips.put_nowait(clip)
+        except queue.Full:
+            self.stopping_clips.put(clip)
+
+    def process_audio(self, audio_input, clip_divider):
+        """Continuously process the audio blocks of one channel until stopped."""
+        while self.running:
+            try:
+                block = audio_input.read_block(timeout=self.read_timeout)
             except queue.Empty:
-                pass  # No block available, just continue
+                continue  # No block available, check again if we are still running
+            clip_divider.add_block(block, audio_input.last_block_time)
+
+        # Drain the blocks captured before the stream stopped and close the open clip
+        while True:
+            try:
+                block = audio_input.read_block(timeout=0)
+                clip_divider.add_block(block, audio_input.last_block_time)
+            except queue.Empty:
+                break
+        clip_divider.flush()
+
+    def next_clip(self, timeout):
+        """Take the next queued clip, then the ones handed over while stopping, in that order."""
+        try:
+            return self.new_clips.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.stopping_clips.get_nowait()
+        except queue.Empty:
+            return self.new_clips.get(timeout=timeout)
+
+    def has_pending_clips(self):
+        return not self.new_clips.empty() or not self.stopping_clips.empty()
+
+    def next_batch(self):
+        """Wait for a clip, then gather more until the batch is full or the deadline passes."""
+        batch = [self.next_clip(self.read_timeout)]  # Wait for a new clip
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.next_clip(remaining))
+            except queue.Empty:
+                break
+        return batch
 
     def transcribe_new_clips(self):
-        """Continuously check for new clips and transcribe them."""
-        while self.running:
+        """Gather new clips and transcribe them in batches until stopped and drained."""
+        while self.transcribing or self.has_pending_clips():
+            if self.speech_to_text is not None and not self.speech_to_text.wait_until_ready(self.read_timeout):
+                if self.speech_to_text.state == "failed":
+                    print("Transcription stopped, the model failed to load.")
+                    break
+                continue  # Clips stay queued until the model is loaded
+
             try:
-                clip_path = self.new_clip_paths.get(timeout=1)  # Wait for a new clip path
-                if clip_path and clip_path.endswith(".wav") and clip_path not in self.processed_files:
-                    # Transcribe the new audio file
-                    clip_data = self.speech_to_text.transcribe_clip(clip_path)
-                    clip_data["admin_user"] = self.clip_controller.current_user
-                    # Add the clip to the database
-                    self.clip_controller.add_audio_clip(clip_data)
-                    print("Transcription complete:", clip_data)
-
-                    # Mark file as processed
-                    self.processed_files.add(clip_path)
+                batch = self.next_batch()
             except queue.Empty:
-                continue  # No new clip paths available
+                continue  # No new clips available
+
+            batch = [
+                clip for clip in batch
+                if clip["file_path"] and clip["file_path"].endswith(".wav")
+                and clip["file_path"] not in self.processed_files
+            ]
+            if not batch:
+                continue
+
+            if self.transcription_pool is not None:
+                # The pool delivers the results to store_clip_data in start time order
+                for clip in batch:
+                    self.transcription_pool.submit(clip)
+                    self.processed_files.add(clip["file_path"])
+                continue
+
+            # Transcribe the clips straight from memory when the divider provides them
+            on_segment = None
+            if self.partial_transcriptions:
+                on_segment = lambda index, segment: self.show_decoded_segment(batch[index], segment)
+            results = self.speech_to_text.transcribe_batch(
+                [(clip["file_path"], clip["audio"]) for clip in batch], on_segment=on_segment
+            )
+            for clip, clip_data in zip(batch, results):
+                clip_data["channel"] = clip["channel"]
+                clip_data["clip_id"] = clip["clip_id"]
+                clip_data["started_at"] = clip["started_at"]
+                clip_data["duration"] = clip["duration"]
+                self.store_clip_data(clip_data)
+                # Mark file as processed
+                self.processed_files.add(clip["file_path"])
+
+    def show_decoded_segment(self, clip, segment):
+        """Show the final transcription of a closed clip as its segments are decoded."""
+        with self.partials_lock:
+            if self.displayed_partials.get(clip["channel"], -1) > clip["clip_id"]:
+                return  # A newer clip of the channel is already on display
+            segments = self.streamed_segments.setdefault((clip["channel"], clip["clip_id"]), [])
+            if segments and segment["start"] < segments[-1]["end"]:
+                segments.clear()  # The clip is being decoded again by another model
+            segments.append(segment)
+            self.displayed_partials[clip["channel"]] = clip["clip_id"]
+            text = " ".join(segment["text"] for segment in segments)
+        self.clip_controller.show_partial_transcription(clip["channel"], text)
+
+    def store_clip_data(self, clip_data):
+        """Add a transcribed clip to the database."""
+        clip_data["admin_user"] = self.clip_controller.current_user
+        self.clip_controller.add_audio_clip(clip_data)
+        print("Transcription complete:", clip_data)
+
+        with self.partials_lock:
+            self.streamed_segments.pop((clip_data["channel"], clip_data["clip_id"]), None)
+            finished = self.displayed_partials.get(clip_data["channel"]) == clip_data["clip_id"]
+            if finished:
+                del self.displayed_partials[clip_data["channel"]]
+        if finished:
+            self.clip_controller.clear_partial_transcription(clip_data["channel"])
+
+    def transcribe_partials(self):
+        """Transcribe the latest window of each open clip and publish the provisional text."""
+        while self.transcribing:
+            if not self.partials_ready.wait(timeout=self.read_timeout):
+                continue
+            with self.partials_lock:
+                partials = list(self.pending_partials.values())
+                self.pending_partials.clear()
+                self.partials_ready.clear()
+
+            if not self.speech_to_text.wait_until_ready(0):
+                continue  # Provisional text is only useful live, drop it while loading
+
+            for clip in partials:
+                segments = self.speech_to_text.transcribe_segments(clip["audio"])
+                with self.partials_lock:
+                    if clip["clip_id"] <= self.closed_clips.get(clip["channel"], -1):
+                        continue  # The clip closed while this window was transcribed
+                    text = self.stitch_partial(clip, segments)
+                    self.displayed_partials[clip["channel"]] = clip["clip_id"]
+                self.clip_controller.show_partial_transcription(clip["channel"], text)
+
+    def stitch_partial(self, clip, segments):
+        """Merge the segments of a window with the ones committed by earlier windows.
+
+        Windows replaced before they were transcribed are never stitched, so the
+        provisional segments of the previous window that end before this one starts
+        are committed here, as no later window will cover them again.
+        """
+        state = self.partial_texts.setdefault((clip["channel"], clip["clip_id"]),
+                                              {"committed": [], "until": 0.0, "tail": []})
+        for start, end, text in state["tail"]:
+            if start >= state["until"] and end <= clip["offset"]:
+                state["committed"].append(text)
+                state["until"] = end
+        provisional = []
+        for start, end, text in segments:
+            start += clip["offset"]
+            end += clip["offset"]
+            if start < state["until"]:
+                continue  # Already committed from an earlier window
+            if end <= clip["next_offset"]:
+                # The next window starts after this segment, so it is final
+                state["committed"].append(text)
+                state["until"] = end
+            else:
+                provisional.append((start, end, text))
+        state["tail"] = provisional
+        return " ".join(state["committed"] + [text for _, _, text in provisional]).strip()
 
     def start(self):
-        """Start the audio processing and transcription."""
+        """Start capturing audio on every channel."""
+        if self.running:
+            return
         self.running = True
-        self.audio_input.start_stream()
+        self.start_transcription()
+
+        # Run the audio processing of each channel in a separate thread
+        self.processing_threads = []
+        for audio_input, clip_divider in self.channels:
+            audio_input.start_stream()
+            processing_thread = threading.Thread(target=self.process_audio,
+                                                 args=(audio_input, clip_divider))
+            processing_thread.start()
+            self.processing_threads.append(processing_thread)
 
-        # Run audio processing in a separate thread
-        self.processing_thread = threading.Thread(target=self.process_audio)
-        self.processing_thread.start()
+    def start_transcription(self):
+        """Start the transcription thread, it keeps running across start/stop cycles."""
+        if self.transcription_thread is not None and self.transcription_thread.is_alive():
+            return
+        self.transcribing = True
+        if self.transcription_pool is not None:
+            self.transcription_pool.start(self.store_clip_data)
 
         # Run transcription in a separate thread
         self.transcription_thread = threading.Thread(target=self.transcribe_new_clips)
         self.transcription_thread.start()
 
+        if self.partial_transcriptions:
+            self.partial_thread = threading.Thread(target=self.transcribe_partials)
+            self.partial_thread.start()
+
     def stop(self):
-        """Stop the audio processing and transcription."""
+        """Stop capturing, closing any clip in progress.
+
+        The captured audio is drained through the dividers before returning, and
+        the resulting clips are left queued for the transcription thread without
+        waiting for room, so stopping takes no longer than the drain itself.
+        """
+        if not self.running:
+            return
+        for audio_input, _ in self.channels:
+            audio_input.stop_stream()
         self.running = False
-        self.processing_thread.join()
-        self.transcription_thread.join()
-        self.audio_input.stop_stream()
+        for processing_thread in self.processing_threads:
+            processing_thread.join()
+        self.processing_threads = []
+
+    def shutdown(self):
+        """Stop capturing and wait until every queued clip is transcribed and saved."""
+        self.stop()
+        if self.transcription_thread is not None:
+            self.transcribing = False
+            self.transcription_thread.join()
+            self.transcription_thread = None
+        if self.partial_thread is not None:
+            self.partial_thread.join()
+            self.partial_thread = None
+        for _, clip_divider in self.channels:
+            clip_divider.stop()
+        if self.transcription_pool is not None:
+            self.transcription_pool.stop()
 
 # Example usage:
 if __name__ == '__main__':
@@ -77,15 +325,12 @@ if __name__ == '__main__':
     s2t = Speech2Text()
     
     # Create the main audio processor
-    audio_processor = AudioProcessor(audio_input, clip_divider, s2t)
-    
-    clip_divider.add_observer(audio_processor)
-    
-    
+    audio_processor = AudioProcessor(audio_input, clip_divider, s2t, None, None)
+
     # Start processing
     audio_processor.start()
 
     # time.sleep(30)
     
     # Stop processing
-    #audio_processor.stop()
+    #audio_processor.shutdown()
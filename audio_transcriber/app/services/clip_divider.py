@@ -1,92 +1,165 @@
 import numpy as np
-import wave
 import scipy.signal as signal
-import time
+import datetime
 import os
+from math import gcd
 from .clip_notifier import ClipNotifier
+from .clip_writer import ClipWriter
+from .voice_activity import RMSDetector
+from .clock import now_us
 
 class ClipDivider(ClipNotifier):
-    def __init__(self, threshold=0.01, samplerate=44100, block_size=1024, channels=1, \
-                 next_clip_margin=0.5, min_clip=0.7):
+    def __init__(self, threshold=0.01, samplerate=16000, block_size=512, channels=1, \
+                 next_clip_margin=0.5, min_clip=0.7, in_memory=True, save_clips=True, \
+                 target_samplerate=16000, max_clip=120, channel="default", vad=None, \
+                 bandpass=False, low_cutoff=80, high_cutoff=2000, partial_interval=None, \
+                 partial_window=10):
         super().__init__()
         self.threshold = threshold
+        self.vad = RMSDetector(threshold) if vad is None else vad  # Decides which blocks are speech
         self.samplerate = samplerate
         self.block_size = block_size
         self.channels = channels
         self.next_clip_margin = next_clip_margin  # Time to wait before closing the clip
         self.min_clip = min_clip  # Minimum clip length in seconds
-        self.buffer = []
-        self.clip_start_time = None
-        self.last_below_threshold_time = None
+        self.max_clip = max_clip  # Clips are closed when they reach this length in seconds
+        self.channel = channel  # Name of the radio source the clips come from
+        self.clip_started_at = None  # Epoch microseconds of the first sample of the clip
         self.in_clip = False
-        self.margin_cicles_count = 0 # To know how many blocks to remove
-
-        # Ensure the clips/ directory exists
-        self.clip_dir = 'clips'
+        self.in_memory = in_memory  # Hand the clip audio to observers instead of a WAV path
+        self.save_clips = save_clips  # Keep a WAV copy of every clip in clip_dir
+        self.target_samplerate = target_samplerate  # Sample rate expected by the transcriber
+        self.clip_writer = ClipWriter() if in_memory and save_clips else None
+        # Open clips are also emitted as partial clips every partial_interval seconds,
+        # holding the last partial_window seconds so consecutive windows overlap
+        self.partial_interval = partial_interval if in_memory else None
+        self.partial_window = partial_window
+        self.last_partial = 0  # Absolute index where the last partial clip ended
+
+        # Streaming bandpass applied to every block before the VAD sees it
+        self.bandpass = bandpass
+        self.low_cutoff = low_cutoff  # Low cutoff frequency in Hz
+        self.high_cutoff = high_cutoff  # High cutoff frequency in Hz
+        self.sos = self.design_bandpass()
+        self.bandpass_zi = np.zeros((self.sos.shape[0], 2, channels))
+
+        # Mirrored ring buffer: every sample is written at i and i + capacity, so any
+        # span of up to capacity samples can be read as one contiguous view
+        self.capacity = int(max_clip * samplerate)
+        self.ring = np.zeros((2 * self.capacity, channels), dtype=np.float32)
+        self.samples_written = 0  # Absolute index of the next sample
+        self.clip_start = 0  # Absolute index of the first sample of the clip
+        self.clip_end = 0  # Absolute index after the last speech block
+        self.silence_time = 0.0  # Seconds without speech since clip_end
+
+        # Ensure the clips/ directory exists, with a subdirectory per extra channel
+        self.clip_dir = 'clips' if channel == "default" else os.path.join('clips', channel)
         if not os.path.exists(self.clip_dir):
             os.makedirs(self.clip_dir)
 
-    def calculate_rms(self, block):
-        """Calculate the RMS of an audio block."""
-        return np.sqrt(np.mean(np.square(block)))
-
-    def add_block(self, block):
-        """Add an audio block and process it to detect clips."""
-        rms = self.calculate_rms(block)
+    def write_block(self, block):
+        """Copy a block into both halves of the ring buffer."""
+        frames = len(block)
+        position = self.samples_written % self.capacity
+        first = min(frames, self.capacity - position)
+        self.ring[position:position + first] = block[:first]
+        self.ring[position + self.capacity:position + self.capacity + first] = block[:first]
+        if first < frames:
+            rest = frames - first
+            self.ring[:rest] = block[first:]
+            self.ring[self.capacity:self.capacity + rest] = block[first:]
+        self.samples_written += frames
+
+    def add_block(self, block, block_time=None):
+        """Add an audio block and process it to detect clips.
+
+        block_time is the capture time of its first sample in epoch microseconds,
+        sources that don't provide one are timed on arrival.
+        """
+        block = block.reshape(len(block), self.channels)
+        if self.bandpass:
+            block = self.bandpass_block(block)
+        speech = self.vad.is_speech(block)
         block_duration = len(block) / self.samplerate # in seconds
+        block_start = self.samples_written
+        self.write_block(block)
 
-        if rms > self.threshold:
-            # print("RMS:", rms)
-
+        if speech:
             if not self.in_clip:
                 self.in_clip = True
-                self.buffer = []
-            
-            self.margin_cicles_count = 0
-            self.buffer.append(block)
-            self.last_below_threshold_time = None  # Reset this since we are above the threshold
-        
+                self.clip_start = block_start
+                self.last_partial = block_start
+                if block_time is None:
+                    block_time = now_us() - int(block_duration * 1_000_000)
+                self.clip_started_at = block_time
+            self.clip_end = self.samples_written
+            self.silence_time = 0.0  # Reset this since the block is speech
+
         elif self.in_clip:
-            if self.last_below_threshold_time is None:
-                self.last_below_threshold_time = block_duration
-                self.buffer.append(block)  # Continue adding blocks while waiting for next_clip_margin to pass
-                self.margin_cicles_count += 1
-
-            elif (self.last_below_threshold_time + block_duration) <= self.next_clip_margin:
-                self.buffer.append(block)  # Add the block within the margin time
-                self.last_below_threshold_time += block_duration
-                self.margin_cicles_count += 1
-
-            else:
-                self.remove_margin_blocks()
+            # Keep waiting for next_clip_margin to pass, the margin is not part of the clip
+            self.silence_time += block_duration
+            if self.silence_time > self.next_clip_margin:
                 self.close_clip()
-                self.in_clip = False
 
-    def remove_margin_blocks(self):
-        """Remove the margin blocks from the buffer."""
-        if self.margin_cicles_count > 0:
-            self.buffer = self.buffer[:-self.margin_cicles_count]
+        if self.in_clip and self.samples_written - self.clip_start >= self.capacity:
+            # Close before the ring buffer overwrites the start of the clip
+            self.clip_end = self.samples_written
+            self.close_clip()
+
+        if (self.in_clip and self.partial_interval is not None
+                and self.samples_written - self.last_partial >= self.partial_interval * self.samplerate):
+            self.emit_partial_clip()
+
+    def emit_partial_clip(self):
+        """Emit the latest window of the open clip for a provisional transcription."""
+        window_start = max(self.clip_start,
+                           self.samples_written - int(self.partial_window * self.samplerate))
+        position = window_start % self.capacity
+        audio_data = self.ring[position:position + self.samples_written - window_start]
+        window_end = (self.samples_written - self.clip_start) / self.samplerate
+        self.last_partial = self.samples_written
+
+        self.notify_observers({
+            "file_path": None,
+            "audio": self.resample_for_transcription(audio_data),
+            "samplerate": self.target_samplerate,
+            "start_time": self.clip_started_at / 1_000_000,
+            "started_at": self.clip_started_at,
+            "channel": self.channel,
+            "clip_id": self.clip_start,
+            "partial": True,
+            "offset": (window_start - self.clip_start) / self.samplerate,  # Window start in the clip
+            # Segments ending before the next window starts won't be transcribed again
+            "next_offset": max(0.0, window_end + self.partial_interval - self.partial_window)
+        })
+
+    def flush(self):
+        """Close the clip in progress, e.g. when the input stops."""
+        if self.in_clip:
+            self.close_clip()
+        self.silence_time = 0.0
+
+    def clip_view(self):
+        """Return the current clip as a contiguous view into the ring buffer."""
+        position = self.clip_start % self.capacity
+        return self.ring[position:position + self.clip_end - self.clip_start]
 
     def close_clip(self):
         """Close and save the clip if it meets the minimum length requirement."""
-        self.clip_length_in_seconds = len(self.buffer) * self.block_size / self.samplerate
+        self.in_clip = False
+        self.clip_length_in_seconds = (self.clip_end - self.clip_start) / self.samplerate
         if self.clip_length_in_seconds >= self.min_clip:
             print(f"Audio clip length: {self.clip_length_in_seconds:.2f} seconds")
             self.save_clip_to_wav()
         else:
             print("Clip discarded because it was too short.")
-        self.buffer = []  # Clear the buffer after saving or discarding the clip
 
-    def bandpass_filter(self, audio_data):
-        # Update the sampling frequency to match the audio file's sample rate
+    def design_bandpass(self):
+        """Design the Butterworth bandpass once for the divider sample rate."""
         nyquist = 0.5 * self.samplerate
-        low_cutoff = 80  # Low cutoff frequency in Hz
-        high_cutoff = 2000  # High cutoff frequency in Hz
-        low = low_cutoff / nyquist
-        high = high_cutoff / nyquist
-
-        # Design the bandpass filter with updated frequencies
-        sos = signal.iirfilter(
+        low = self.low_cutoff / nyquist
+        high = self.high_cutoff / nyquist
+        return signal.iirfilter(
             N=4,
             Wn=[low, high],
             btype='band',
@@ -94,30 +167,61 @@ class ClipDivider(ClipNotifier):
             output='sos'
         )
 
-        # Apply the SOS filter to the audio signal
-        filtered_audio_data = signal.sosfilt(sos, audio_data)
-        return filtered_audio_data
+    def bandpass_block(self, block):
+        """Filter one block, carrying the filter state over to the next block."""
+        filtered, self.bandpass_zi = signal.sosfilt(self.sos, block, axis=0, zi=self.bandpass_zi)
+        return filtered.astype(np.float32)
+
+    def bandpass_filter(self, audio_data):
+        """Filter a whole signal at once with the precomputed coefficients."""
+        return signal.sosfilt(self.sos, audio_data, axis=0)
+
+    def resample_for_transcription(self, audio_data):
+        """Downmix to mono float32 at the transcriber sample rate."""
+        if audio_data.ndim > 1:
+            audio_data = audio_data.mean(axis=1) if audio_data.shape[1] > 1 else audio_data[:, 0]
+        if self.samplerate == self.target_samplerate:
+            # Copy out of the ring buffer, it is reused for the next clips
+            return np.array(audio_data, dtype=np.float32)
+        factor = gcd(self.samplerate, self.target_samplerate)
+        audio_data = signal.resample_poly(audio_data, self.target_samplerate // factor,
+                                          self.samplerate // factor)
+        return audio_data.astype(np.float32, copy=False)
+
+    def clip_file_path(self):
+        """Generate a file_path based on the clip start time and length."""
+        started = datetime.datetime.fromtimestamp(self.clip_started_at / 1_000_000)
+        timestamp = started.strftime('%Y%m%d_%H%M%S')
+        clip_length = str(round(self.clip_length_in_seconds, 2)).replace(".", "#")
+        return os.path.join(self.clip_dir, f"clip_{timestamp}_{clip_length}.wav")
 
     def save_clip_to_wav(self):
-        """Save the audio clip buffer to a WAV file."""
-        # Generate a file_path based on the current date and time
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-        self.clip_length_in_seconds = str(round(self.clip_length_in_seconds, 2)).replace(".", "#")
-        file_path = os.path.join(self.clip_dir, f"clip_{timestamp}_{self.clip_length_in_seconds}.wav")
-
-        audio_data = np.concatenate(self.buffer)
-        # audio_data = self.bandpass_filter(audio_data)
-        audio_data_int = np.int16(audio_data * 32767)
-
-        # Using a try-finally block to ensure the file is closed properly
-        with wave.open(file_path, 'wb') as wf:
-            try:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)  # Assuming 16-bit audio
-                wf.setframerate(self.samplerate)
-                wf.writeframes(audio_data_int.tobytes())
-            finally:
-                wf.close()  # Ensures the file is closed properly even if an error occurs
-        # Logic to create a clip
-        self.notify_observers(file_path)  # Notify observers about the new clip
-        print(f"Clip saved as {file_path}")
+        """Emit the clip to observers, persisting it as a WAV file if enabled."""
+        file_path = self.clip_file_path()
+        audio_data = self.clip_view()
+
+        clip = {
+            "file_path": file_path,
+            "audio": None,
+            "samplerate": self.target_samplerate,
+            "start_time": self.clip_started_at / 1_000_000,
+            "started_at": self.clip_started_at,  # Epoch microseconds, captured with the audio
+            "duration": self.clip_length_in_seconds,
+            "channel": self.channel,
+            "clip_id": self.clip_start,  # Increases with every clip of the channel
+            "partial": False
+        }
+        if self.in_memory:
+            clip["audio"] = self.resample_for_transcription(audio_data)
+            if self.clip_writer is not None:
+                self.clip_writer.write(file_path, audio_data.copy(), self.samplerate, self.channels)
+        else:
+            # The transcriber decodes the file itself, so it must be on disk before notifying
+            ClipWriter.save_wav(file_path, audio_data, self.samplerate, self.channels)
+
+        self.notify_observers(clip)  # Notify observers about the new clip
+
+    def stop(self):
+        """Wait for any pending background WAV writes to finish."""
+        if self.clip_writer is not None:
+            self.clip_writer.stop()
@@ -9,6 +9,6 @@ class ClipNotifier:
     def remove_observer(self, observer):
         self.observers.remove(observer)
 
-    def notify_observers(self, clip_path):
+    def notify_observers(self, clip):
         for observer in self.observers:
-            observer.update(clip_path)
\ No newline at end of file
+            observer.update(clip)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import threading
+import queue
+from app.models.audio_clip import AudioClip
+from app.services.api_interface import ApiInterface
+
+class ClipUploader:
+    """Post committed clips to the backend on a background thread.
+
+    Keeps a slow or unreachable backend from holding up the database writer, each
+    request gives up after timeout seconds.
+    """
+    def __init__(self, api_interface=None, timeout=10, stop_timeout=5):
+        self.api_interface = api_interface or ApiInterface()
+        self.timeout = timeout  # Seconds a post may take
+        self.stop_timeout = stop_timeout  # Seconds stop waits for the pending posts
+        self.q = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.upload_clips, daemon=True)
+            self.thread.start()
+
+    def upload(self, row):
+        """Queue a committed AudioClip row to be posted."""
+        self.start()
+        self.q.put(row)
+
+    def upload_clips(self):
+        """Post queued clips until a stop sentinel is received."""
+        while True:
+            row = self.q.get()
+            if row is None:
+                break
+            try:
+                self.api_interface.post_clip(AudioClip(**row), timeout=self.timeout)
+            except Exception as e:
+                print(f"Error posting audio clip: {e}")
+
+    def stop(self):
+        """Post the pending clips, giving up on them after stop_timeout seconds."""
+        if self.thread is not None and self.thread.is_alive():
+            self.q.put(None)
+            self.thread.join(self.stop_timeout)
+            if self.thread.is_alive():
+                print("Gave up posting the pending audio clips.")
+        self.thread = None
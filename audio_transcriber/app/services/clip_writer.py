@@ -0,0 +1,49 @@
+import threading
+import queue
+import wave
+import numpy as np
+
+class ClipWriter:
+    """Persist audio clips to WAV files on a background thread."""
+    def __init__(self, max_pending=64):
+        self.q = queue.Queue(maxsize=max_pending)
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.write_clips, daemon=True)
+            self.thread.start()
+
+    def write(self, file_path, audio_data, samplerate, channels):
+        """Queue a clip to be written without blocking the caller on disk I/O."""
+        self.start()
+        self.q.put((file_path, audio_data, samplerate, channels))
+
+    def write_clips(self):
+        """Write queued clips until a stop sentinel is received."""
+        while True:
+            item = self.q.get()
+            if item is None:
+                break
+            try:
+                self.save_wav(*item)
+            except Exception as e:
+                print(f"Error writing clip {item[0]}: {e}")
+
+    @staticmethod
+    def save_wav(file_path, audio_data, samplerate, channels):
+        """Save float audio in [-1, 1] as a 16-bit PCM WAV file."""
+        audio_data_int = np.int16(np.clip(audio_data, -1.0, 1.0) * 32767)
+        with wave.open(file_path, 'wb') as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)  # 16-bit audio
+            wf.setframerate(samplerate)
+            wf.writeframes(audio_data_int.tobytes())
+        print(f"Clip saved as {file_path}")
+
+    def stop(self):
+        """Flush pending clips and stop the writer thread."""
+        if self.thread is not None and self.thread.is_alive():
+            self.q.put(None)
+            self.thread.join()
+        self.thread = None
@@ -0,0 +1,8 @@
+import time
+
+# Epoch anchor of the monotonic clock, taken once so timestamps never step backwards
+EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+
+def now_us():
+    """Current UTC time in epoch microseconds, advancing monotonically."""
+    return (EPOCH_OFFSET_NS + time.monotonic_ns()) // 1000
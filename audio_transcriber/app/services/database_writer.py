@@ -0,0 +1,125 @@
+import datetime
+import math
+import threading
+import queue
+import time
+from peewee import chunked
+from data.database import db
+from app.models.audio_clip import AudioClip
+from app.models.clip_segment import ClipSegment
+
+CLIP_FIELDS = ("transcription", "summary", "started_at", "duration", "description", "score",
+               "admin_user", "file_path")
+
+class DatabaseWriter:
+    """Insert transcribed clips on a background thread, batched into short transactions.
+
+    Clips arriving within flush_interval of each other are committed together, and the
+    committed rows are handed to on_committed(rows) so the UI can show them without
+    reading them back.
+    """
+    def __init__(self, on_committed=None, flush_interval=0.2, max_batch=64):
+        self.on_committed = on_committed
+        self.flush_interval = flush_interval  # Seconds a batch waits for more clips
+        self.max_batch = max_batch
+        self.q = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.write_clips, daemon=True)
+            self.thread.start()
+
+    def write(self, clip_data):
+        """Queue a transcribed clip to be inserted."""
+        self.start()
+        self.q.put(clip_data)
+
+    def next_batch(self):
+        """Wait for a clip, then gather more until the batch is full or the interval passes.
+
+        Returns the batch and whether the stop sentinel was received.
+        """
+        item = self.q.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def write_clips(self):
+        """Insert queued clips until a stop sentinel is received."""
+        stopping = False
+        while not stopping:
+            batch, stopping = self.next_batch()
+            if not batch:
+                continue
+            try:
+                rows = self.insert_clips(batch)
+            except Exception as e:
+                print(f"Error adding {len(batch)} audio clips, retrying them one by one: {e}")
+                rows = self.insert_each(batch)
+            if rows and self.on_committed is not None:
+                self.on_committed(rows)
+
+    def insert_each(self, batch):
+        """Insert clips in their own transactions, so a bad clip doesn't take the batch with it."""
+        rows = []
+        for clip_data in batch:
+            try:
+                rows.extend(self.insert_clips([clip_data]))
+            except Exception as e:
+                print(f"Error adding audio clip {clip_data.get('file_path')}: {e}")
+        return rows
+
+    def insert_clips(self, batch):
+        """Insert clips and their segments in one transaction, returning the committed rows."""
+        rows = [self.clip_row(clip_data) for clip_data in batch]
+        with db.atomic():
+            last_id = AudioClip.insert_many(rows).execute()
+            # A single multi-row insert in a write transaction gets consecutive rowids
+            for row, clip_id in zip(rows, range(last_id - len(rows) + 1, last_id + 1)):
+                row["id"] = clip_id
+            segments = [
+                dict(segment, clip=row["id"])
+                for row, clip_data in zip(rows, batch)
+                for segment in clip_data.get("segments", [])
+            ]
+            for segment_batch in chunked(segments, 100):  # Stay under SQLite's variable limit
+                ClipSegment.insert_many(segment_batch).execute()
+        return rows
+
+    @staticmethod
+    def clip_row(data):
+        """Map transcribed clip data to AudioClip columns."""
+        row = {field: data[field] for field in CLIP_FIELDS}
+        if math.isnan(row["score"]):
+            row["score"] = 0.0  # Nothing was transcribed, and SQLite can't store NaN
+        # The day and clock columns are the local time of started_at
+        started = datetime.datetime.fromtimestamp(data["started_at"] / 1_000_000)
+        row["date"] = started.strftime("%Y/%m/%d")
+        row["time_start"] = started.strftime("%H:%M:%S")
+        row["time_end"] = (started + datetime.timedelta(seconds=data["duration"])).strftime("%H:%M:%S")
+        row["channel"] = data.get("channel", "default")
+        row["tier"] = data.get("tier", "full")
+        row["skipped"] = data.get("skipped", False)
+        row["speech_ratio"] = data.get("speech_ratio")
+        return row
+
+    def stop(self):
+        """Commit the pending clips and stop the writer thread."""
+        if self.thread is not None and self.thread.is_alive():
+            self.q.put(None)
+            self.thread.join()
+        self.thread = None
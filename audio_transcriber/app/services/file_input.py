@@ -0,0 +1,61 @@
+import threading
+import queue
+import time
+import wave
+import numpy as np
+from .clock import now_us
+
+class FileAudioInput:
+    """Play a 16-bit WAV file through the same interface as AudioInput."""
+    def __init__(self, file_path, blocksize=512, realtime=True, max_duration=60):
+        self.file_path = file_path
+        self.blocksize = blocksize
+        self.realtime = realtime  # Pace the blocks like a live source
+        with wave.open(file_path, 'rb') as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"Only 16-bit WAV files are supported: {file_path}")
+            self.samplerate = wf.getframerate()
+            self.channels = wf.getnchannels()
+        self.max_blocks = int((self.samplerate * max_duration) / blocksize)
+        self.q = queue.Queue(maxsize=self.max_blocks)
+        self.thread = None
+        self.active = False
+        self.last_block_time = None  # Epoch microseconds of the first sample of the last block read
+
+    def _read_file(self):
+        """Read the file block by block into the queue."""
+        block_duration = self.blocksize / self.samplerate
+        next_block_time = time.monotonic()
+        start_time = now_us()  # The file plays as if captured from now on
+        position = 0
+        with wave.open(self.file_path, 'rb') as wf:
+            while self.active:
+                frames = wf.readframes(self.blocksize)
+                if not frames:
+                    break
+                block = np.frombuffer(frames, dtype=np.int16).reshape(-1, self.channels)
+                block_time = start_time + position * 1_000_000 // self.samplerate
+                position += len(block)
+                self.q.put((block_time, block.astype(np.float32) / 32768))  # Blocks while the queue is full
+
+                if self.realtime:
+                    next_block_time += block_duration
+                    time.sleep(max(0.0, next_block_time - time.monotonic()))
+        self.active = False
+
+    def start_stream(self):
+        self.active = True
+        self.thread = threading.Thread(target=self._read_file, daemon=True)
+        self.thread.start()
+
+    def read_block(self, timeout=None):
+        """Get the next audio block from the queue, raising queue.Empty after timeout seconds."""
+        self.last_block_time, block = self.q.get(timeout=timeout)
+        return block
+
+    def stop_stream(self):
+        self.active = False
+
+    def is_active(self):
+        """Check if the file is still being played."""
+        return self.active
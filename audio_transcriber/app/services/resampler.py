@@ -0,0 +1,30 @@
+import numpy as np
+import scipy.signal as signal
+from numpy.lib.stride_tricks import sliding_window_view
+
+class StreamingDecimator:
+    """Decimate a block stream by an integer factor with a polyphase FIR filter.
+
+    Only the kept output samples are computed, and the filter history is carried
+    over between blocks so block boundaries leave no artifacts.
+    """
+    def __init__(self, factor, channels=1, taps_per_phase=16):
+        self.factor = factor
+        numtaps = factor * taps_per_phase + 1
+        # Anti-aliasing lowpass just below the output Nyquist frequency
+        self.taps = signal.firwin(numtaps, 0.9 / factor).astype(np.float32)[::-1].copy()
+        self.history = np.zeros((numtaps - 1, channels), dtype=np.float32)
+        self.phase = 0  # Offset of the next output sample within the next block
+
+    def process(self, block):
+        """Return the decimated samples for one (frames, channels) block."""
+        numtaps = len(self.taps)
+        samples = np.concatenate((self.history, block))
+        # Window i ends at sample i + numtaps - 1, so the outputs start at window phase
+        windows = sliding_window_view(samples, numtaps, axis=0)[self.phase::self.factor]
+        output = windows @ self.taps
+
+        kept = len(windows)
+        self.phase = self.phase + kept * self.factor - len(block)
+        self.history = samples[-(numtaps - 1):]
+        return output.astype(np.float32, copy=False)
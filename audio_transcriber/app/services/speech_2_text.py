@@ -1,60 +1,314 @@
-from faster_whisper import WhisperModel
-import torch
 import numpy as np
 import os
-import datetime
+import threading
+
+class SegmentCollector:
+    """Gather the segments of one clip as they are decoded, dropping repeated texts.
+
+    Whisper stuck in a repetition loop emits the same text over and over, so once
+    max_repeats repeats come in a row collect() stops consuming the decoder.
+    """
+    def __init__(self, offset=0.0, on_segment=None, max_repeats=3):
+        self.offset = offset  # Seconds added to the segment times
+        self.on_segment = on_segment
+        self.max_repeats = max_repeats
+        self.seen = set()
+        self.segments = []
+        self.repeats = 0  # Repeated segments in a row
+
+    def add(self, segment, offset=0.0):
+        """Keep a decoded segment unless its text was already seen, returning whether it was kept."""
+        text = segment.text.strip()
+        if text in self.seen:
+            self.repeats += 1
+            return False
+        self.repeats = 0
+        self.seen.add(text)
+        kept = {
+            "start": segment.start + offset + self.offset,
+            "end": segment.end + offset + self.offset,
+            "text": text,
+            "avg_logprob": segment.avg_logprob,
+            "no_speech_prob": segment.no_speech_prob
+        }
+        self.segments.append(kept)
+        if self.on_segment is not None:
+            self.on_segment(kept)
+        return True
+
+    def collect(self, segments):
+        """Consume a segment generator, abandoning it when decoding loops."""
+        for segment in segments:
+            self.add(segment)
+            if self.repeats >= self.max_repeats:
+                print(f"Stopped decoding after {self.repeats} repeated segments.")
+                break
+
+    def transcript(self):
+        return " ".join(segment["text"] for segment in self.segments)
 
 class Speech2Text:
-    def __init__(self, model_size=None, language="es"):
+    def __init__(self, model_size=None, language="es", batch_size=8, cpu_threads=0, num_workers=1,
+                 lazy=False, device="auto", draft_model_size=None, redecode_threshold=0.6,
+                 speech_gate=None, vad_filter=False, cache=None):
         os.environ["KMP_DUPLICATE_LIB_OK"]="TRUE"
         self.model_size = "large-v3" if model_size is None else model_size
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = WhisperModel(self.model_size, device=self.device, compute_type="int8")
+        self.device = device  # "cpu", "cuda" or "auto"
+        self.cpu_threads = cpu_threads  # 0 lets CTranslate2 pick the thread count
+        # num_workers > 1 lets partial transcriptions run alongside the final ones
+        self.num_workers = num_workers
+        self.model = None
+        self.batched_model = None
+        # Optional fast model tried first, the main model re-decodes clips scoring below the threshold
+        self.draft_model_size = draft_model_size
+        self.redecode_threshold = redecode_threshold
+        self.draft_model = None
+        self.draft_batched_model = None
+        self.speech_gate = speech_gate  # Trims silence and skips clips without speech
+        self.vad_filter = vad_filter  # Whisper's own VAD on clips decoded one at a time
+        self.cache = cache  # Transcriptions of repeated audio, hits skip the model
+        self.state = "idle"  # idle, loading, ready or failed
+        self.ready = threading.Event()
+        self.batch_size = batch_size  # Max chunks decoded in parallel by the batched pipeline
+        self.samplerate = 16000  # Whisper input sample rate
+        self.chunk_length = 30  # Whisper window length in seconds
         self.language = language
         self.min_log_prob = -1.62
         self.max_log_prob = -0.12 # max prob - min prob must be greater than 0
         self.clips_path = "./clips"
+        if not lazy:
+            self.load()
+
+    def load(self):
+        """Import the model stack and load the Whisper models."""
+        self.state = "loading"
+        try:
+            # Imported here so constructing a lazy Speech2Text doesn't pay for it
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+            self.device = self.detect_device(self.device)
+            self.model = WhisperModel(self.model_size, device=self.device, compute_type="int8",
+                                      cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+            self.batched_model = BatchedInferencePipeline(model=self.model)
+            if self.draft_model_size is not None:
+                self.draft_model = WhisperModel(self.draft_model_size, device=self.device,
+                                                compute_type="int8", cpu_threads=self.cpu_threads,
+                                                num_workers=self.num_workers)
+                self.draft_batched_model = BatchedInferencePipeline(model=self.draft_model)
+        except Exception:
+            self.state = "failed"
+            raise
+        self.state = "ready"
+        self.ready.set()
+
+    @staticmethod
+    def detect_device(device="auto"):
+        """Resolve "auto" to cuda when CTranslate2 sees a GPU, without importing torch."""
+        if device != "auto":
+            return device
+        import ctranslate2
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+    def load_async(self, on_done=None):
+        """Load the model on a background thread, calling on_done(state) when finished."""
+        def load_model():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Error loading the {self.model_size} model: {e}")
+            if on_done is not None:
+                on_done(self.state)
+
+        threading.Thread(target=load_model, daemon=True).start()
+
+    def wait_until_ready(self, timeout=None):
+        """Wait for the model to be loaded, returning whether it is ready."""
+        return self.ready.wait(timeout)
+
+    def transcribe_clip(self, clip_path, audio=None, on_segment=None):
+        """Transcribe a clip, using its in-memory 16 kHz audio when available."""
+        if on_segment is not None:
+            return self.transcribe_batch([(clip_path, audio)], lambda _, segment: on_segment(segment))[0]
+        return self.transcribe_batch([(clip_path, audio)])[0]
+
+    def transcribe_batch(self, clips, on_segment=None):
+        """Transcribe a list of (clip_path, audio) pairs with batched model calls.
+
+        The speech gate trims every clip first and skips the ones with too little speech,
+        and clips matching a cached fingerprint reuse the cached transcription.
+        With a draft model the rest go through it first, and only the clips it scores
+        below redecode_threshold are decoded again by the main model.
+        on_segment(index, segment) is called with every segment as it is decoded.
+        Results keep the input order.
+        """
+        results = [None] * len(clips)
+        sources = {}
+        speech_ratios = {}
+        offsets = {}  # Seconds trimmed from the start of each clip by the speech gate
+        for index, (clip_path, audio) in enumerate(clips):
+            source, speech_ratio, offsets[index] = self.gate_clip(clip_path, audio)
+            if source is None:
+                results[index] = self.build_clip_data(clip_path, "", 0.0)
+                results[index].update(tier="skipped", skipped=True, speech_ratio=speech_ratio,
+                                      segments=[])
+                print(f"Skipped clip without enough speech ({speech_ratio:.0%}): {clip_path}")
+            else:
+                sources[index] = source
+                speech_ratios[index] = speech_ratio
+
+        fingerprints = {}
+        if self.cache is not None:
+            for index in list(sources):
+                sources[index] = self.load_audio(sources[index])
+                fingerprints[index] = self.cache.fingerprint(sources[index])
+                cached = self.cache.get(fingerprints[index])
+                if cached is not None:
+                    results[index] = self.build_clip_data(clips[index][0], cached["transcription"],
+                                                          cached["score"])
+                    results[index].update(tier=cached["tier"], skipped=False,
+                                          speech_ratio=speech_ratios[index],
+                                          segments=self.shift_segments(cached["segments"], offsets[index]))
+                    del sources[index]
+                    stats = self.cache.get_stats()
+                    print(f"Transcription reused from the cache ({stats['hit_rate']:.0%} hit rate): "
+                          f"{clips[index][0]}")
 
-    def transcribe_clip(self, clip_path):
-        segments, _ = self.model.transcribe(clip_path, beam_size=5, language=self.language)
-        transcripts = []
-        log_probs = []
+        pending = list(sources)
+        for (model, tier), batched_model in zip(self.model_tiers(), self.batched_tiers()):
+            if not pending:
+                break
+            collectors = [SegmentCollector(offsets[index], self.segment_callback(on_segment, index))
+                          for index in pending]
+            if len(pending) == 1:
+                # A lone clip is decoded sequentially, the batched layout gains nothing
+                segments, _ = model.transcribe(sources[pending[0]], beam_size=5,
+                                               language=self.language, vad_filter=self.vad_filter)
+                collectors[0].collect(segments)
+            else:
+                for index in pending:
+                    sources[index] = self.load_audio(sources[index])
+                self.transcribe_audios(batched_model, [sources[index] for index in pending], collectors)
+
+            redecode = []
+            for index, collector in zip(pending, collectors):
+                score = self.transcript_score([segment["avg_logprob"] for segment in collector.segments])
+                if tier == "draft" and not self.accept_draft(score):
+                    redecode.append(index)
+                    continue
+                results[index] = self.build_clip_data(clips[index][0], collector.transcript(), score)
+                results[index].update(tier=tier, skipped=False, speech_ratio=speech_ratios[index],
+                                      segments=collector.segments)
+                if self.cache is not None:
+                    # Cached relative to the speech, the next match may be trimmed differently
+                    cached = dict(results[index],
+                                  segments=self.shift_segments(collector.segments, -offsets[index]))
+                    self.cache.put(fingerprints[index], cached)
+            pending = redecode
+        return results
+
+    def gate_clip(self, clip_path, audio):
+        """Return the audio to transcribe, or None to skip it, its speech ratio and trimmed start in seconds."""
+        source = clip_path if audio is None else audio
+        if self.speech_gate is None:
+            return source, None, 0.0
+        audio = self.load_audio(source)
+        start, end, speech_ratio = self.speech_gate.find_speech(audio)
+        if speech_ratio < self.speech_gate.min_speech_ratio:
+            return None, speech_ratio, 0.0
+        return audio[start:end], speech_ratio, start / self.samplerate
+
+    @staticmethod
+    def load_audio(source):
+        """Decode a clip file into 16 kHz audio, arrays are returned as they are."""
+        if not isinstance(source, str):
+            return source
+        from faster_whisper import decode_audio
+        return decode_audio(source)
+
+    @staticmethod
+    def segment_callback(on_segment, index):
+        """Bind the clip index to an on_segment(index, segment) callback."""
+        if on_segment is None:
+            return None
+        return lambda segment: on_segment(index, segment)
+
+    @staticmethod
+    def shift_segments(segments, offset):
+        """Return copies of segment dicts moved by offset seconds."""
+        return [dict(segment, start=segment["start"] + offset, end=segment["end"] + offset)
+                for segment in segments]
+
+    def transcribe_audios(self, batched_model, audios, collectors):
+        """Decode several audios in one batched call, feeding each one's segments to its collector.
+
+        Every audio is laid out as one or more <=30 s chunks of a single buffer, so the
+        batched pipeline decodes several clips in parallel.
+        """
+        chunk_samples = self.chunk_length * self.samplerate
+        clip_timestamps = []
+        clip_starts = []
+        clip_ends = []
+        offset = 0
+        for audio in audios:
+            for start in range(0, len(audio), chunk_samples):
+                end = min(start + chunk_samples, len(audio))
+                clip_timestamps.append({"start": offset + start, "end": offset + end})
+            clip_starts.append(offset / self.samplerate)
+            offset += len(audio)
+            clip_ends.append(offset / self.samplerate)
+
+        segments, _ = batched_model.transcribe(
+            np.concatenate(audios),
+            beam_size=5,
+            language=self.language,
+            clip_timestamps=clip_timestamps,
+            batch_size=self.batch_size,
+            without_timestamps=False  # The pipeline's default returns one segment per chunk
+        )
+        # Route every segment, as it is decoded, to the clip its midpoint falls in
         for segment in segments:
-            if segment.text not in transcripts:
-                transcripts.append(segment.text)
-                log_probs.append(segment.avg_logprob)
-
-        transcript = " ".join(transcripts)
-        score = self.transcript_score(log_probs)
-        parsed_data = self.parse_clip_data(clip_path, transcript, score)
-        return parsed_data
-    
+            index = min(np.searchsorted(clip_ends, (segment.start + segment.end) / 2, side="right"),
+                        len(audios) - 1)
+            collectors[index].add(segment, -clip_starts[index])
+
+    def model_tiers(self):
+        """Return the (model, tier) pairs to try in order."""
+        if self.draft_model is None:
+            return [(self.model, "full")]
+        return [(self.draft_model, "draft"), (self.model, "full")]
+
+    def batched_tiers(self):
+        """Return the batched pipelines matching model_tiers."""
+        if self.draft_batched_model is None:
+            return [self.batched_model]
+        return [self.draft_batched_model, self.batched_model]
+
+    def accept_draft(self, score):
+        """Keep a draft transcription unless its normalized score is low or missing."""
+        return not np.isnan(score) and score >= self.redecode_threshold
+
+    def transcribe_segments(self, audio):
+        """Quickly transcribe an audio window into (start, end, text) segments.
+
+        Used for provisional text while a clip is still open, so it trades accuracy
+        for latency with greedy decoding, on the draft model when there is one.
+        """
+        model = self.model if self.draft_model is None else self.draft_model
+        segments, _ = model.transcribe(audio, beam_size=1, language=self.language,
+                                            condition_on_previous_text=False)
+        return [(segment.start, segment.end, segment.text) for segment in segments]
+
     def transcript_score(self, log_probs):
         log_probs = np.array(log_probs)
         log_probs = (log_probs - self.min_log_prob) / (self.max_log_prob - self.min_log_prob)
         return log_probs.mean()
     
-    def parse_clip_data(self, file_name, transcription, score):
-        # input: file name is clip_{%Y%m%d_%H%M%S}_{clip_length_in_seconds}.wav
-        # output: dict with date, time_start, time_end, duration "transcription", "summary", "date", "time_start", "time_end", "duration", "description", "score", "file_path".
-        
-        # Extract date, time_start, time_end, duration from file_name
-        date, time_start, duration = file_name.split("_")[1:]
-        time_start = time_start[:2] + ":" + time_start[2:4] + ":" + time_start[4:]
-        time_start_datetime = datetime.datetime.strptime(time_start, "%H:%M:%S")
-        duration = float(duration.split(".")[0].replace("#", "."))
-        duration_datetime = datetime.timedelta(seconds=duration)
-        time_end = (time_start_datetime + duration_datetime).strftime("%H:%M:%S")
-        date = date[:4] + "/" + date[4:6] + "/" + date[6:]
+    def build_clip_data(self, file_name, transcription, score):
+        """Return the transcription fields of a clip, its timing comes from the clip itself."""
         return {
             "transcription": transcription,
             "summary": '',
-            "date": date,
-            "time_start": time_start,
-            "time_end": time_end,
-            "duration": duration,
             "description": "Transcription of an audio clip.",
             "score": score,
             "file_path": file_name
         }
-
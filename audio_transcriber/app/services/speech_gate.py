@@ -0,0 +1,29 @@
+class SpeechGate:
+    """Find the speech in a clip before it reaches Whisper.
+
+    Runs the Silero VAD bundled with faster-whisper over the whole clip, so clips
+    that are mostly squelch noise can be skipped and the silence around the speech
+    trimmed, which shortens the audio the encoder has to process.
+    """
+    def __init__(self, min_speech_ratio=0.1, padding=0.2, threshold=0.5, min_silence=0.5,
+                 samplerate=16000):
+        self.min_speech_ratio = min_speech_ratio  # Clips with less speech than this are skipped
+        self.padding = int(padding * samplerate)  # Samples kept around the speech
+        self.threshold = threshold  # Silero speech probability threshold
+        self.min_silence = min_silence  # Seconds of silence that split speech regions
+        self.samplerate = samplerate
+
+    def find_speech(self, audio):
+        """Return (start, end, speech_ratio) of the speech in a mono 16 kHz clip."""
+        # Imported here so the gate can be pickled to worker processes before the model stack loads
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        options = VadOptions(threshold=self.threshold, speech_pad_ms=0,
+                             min_silence_duration_ms=int(self.min_silence * 1000))
+        timestamps = get_speech_timestamps(audio, options, sampling_rate=self.samplerate)
+        if not timestamps or len(audio) == 0:
+            return 0, 0, 0.0
+        speech = sum(timestamp["end"] - timestamp["start"] for timestamp in timestamps)
+        start = max(0, timestamps[0]["start"] - self.padding)
+        end = min(len(audio), timestamps[-1]["end"] + self.padding)
+        return start, end, speech / len(audio)
@@ -0,0 +1,108 @@
+import socket
+import struct
+import threading
+import queue
+import numpy as np
+import scipy.signal as signal
+from .clock import now_us
+
+class TcpIqInput:
+    """FM-demodulated audio from an rtl_tcp IQ stream, with the AudioInput interface."""
+    def __init__(self, host='127.0.0.1', port=1234, center_freq=88_900_000, iq_samplerate=240000,
+                 samplerate=16000, blocksize=512, deviation=5000, max_duration=60):
+        if iq_samplerate % samplerate != 0:
+            raise ValueError("iq_samplerate must be a multiple of samplerate.")
+        self.host = host
+        self.port = port
+        self.center_freq = center_freq
+        self.iq_samplerate = iq_samplerate
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.channels = 1
+        self.decimation = iq_samplerate // samplerate
+        # Scale so that the peak frequency deviation maps to an amplitude of 1
+        self.gain = iq_samplerate / (2 * np.pi * deviation)
+        self.max_blocks = int((samplerate * max_duration) / blocksize)
+        self.q = queue.Queue(maxsize=self.max_blocks)
+        self.socket = None
+        self.thread = None
+        self.active = False
+        self.last_block_time = None  # Epoch microseconds of the first sample of the last block read
+
+        # Streaming demodulator state, carried across socket reads
+        self.sos = signal.butter(8, 0.8 / self.decimation, output='sos')
+        self.zi = np.zeros((self.sos.shape[0], 2))
+        self.last_iq = np.complex64(1)
+        self.phase = 0  # Offset of the next kept sample in the next chunk
+        self.pending = np.zeros(0, dtype=np.float32)  # Audio waiting to fill a block
+
+    def send_command(self, command, value):
+        self.socket.sendall(struct.pack('>BI', command, value))
+
+    def demodulate(self, data):
+        """Turn raw unsigned 8-bit IQ bytes into audio at samplerate."""
+        iq = np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 127.5
+        iq = iq[0::2] + 1j * iq[1::2]
+        previous = np.concatenate(([self.last_iq], iq[:-1]))
+        self.last_iq = iq[-1]
+        demodulated = np.angle(iq * np.conj(previous)) * self.gain
+        filtered, self.zi = signal.sosfilt(self.sos, demodulated, zi=self.zi)
+        audio = filtered[self.phase::self.decimation]
+        self.phase = (self.phase - len(filtered)) % self.decimation
+        return audio.astype(np.float32)
+
+    def _receive(self):
+        """Read IQ data from the socket and queue audio blocks."""
+        leftover = b''
+        while self.active:
+            try:
+                data = self.socket.recv(16384)
+            except OSError:
+                break
+            if not data:
+                break
+            data = leftover + data
+            if len(data) % 2:
+                data, leftover = data[:-1], data[-1:]
+            else:
+                leftover = b''
+            self.pending = np.concatenate((self.pending, self.demodulate(data)))
+            # The last demodulated sample was received just now
+            pending_end = now_us()
+            while len(self.pending) >= self.blocksize:
+                block_time = pending_end - len(self.pending) * 1_000_000 // self.samplerate
+                block = self.pending[:self.blocksize].reshape(-1, 1)
+                self.pending = self.pending[self.blocksize:]
+                if self.q.full():
+                    try:
+                        self.q.get_nowait()  # Remove oldest block if the queue is full
+                    except queue.Empty:
+                        pass
+                self.q.put((block_time, block))
+        self.active = False
+
+    def start_stream(self):
+        self.socket = socket.create_connection((self.host, self.port))
+        self.socket.recv(12)  # rtl_tcp dongle info header
+        self.send_command(0x02, self.iq_samplerate)  # Sample rate
+        self.send_command(0x01, self.center_freq)  # Center frequency
+        self.send_command(0x03, 0)  # Automatic gain mode
+        self.send_command(0x08, 1)  # RTL AGC on
+        self.active = True
+        self.thread = threading.Thread(target=self._receive, daemon=True)
+        self.thread.start()
+
+    def read_block(self, timeout=None):
+        """Get the next audio block from the queue, raising queue.Empty after timeout seconds."""
+        self.last_block_time, block = self.q.get(timeout=timeout)
+        return block
+
+    def stop_stream(self):
+        self.active = False
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def is_active(self):
+        """Check if the IQ stream is active."""
+        return self.active
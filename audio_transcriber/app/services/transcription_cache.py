@@ -0,0 +1,129 @@
+import json
+import time
+from collections import OrderedDict
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class TranscriptionCache:
+    """Reuse transcriptions of audio that was already heard, like beacons and repeated announcements.
+
+    Clips are matched by a spectral fingerprint: one bit per band and frame telling
+    whether the band energy difference grows over time. Two clips match when their
+    fingerprints have about the same length and differ in few enough bits, so noise and a
+    slightly different clip start still find the cached entry. The most recently used
+    entries are kept in memory and persisted to the cache database.
+    """
+    def __init__(self, max_entries=512, max_bit_error=0.3, max_shift=4, samplerate=16000,
+                 frame_size=2048, hop_size=256, bands=17, low_cutoff=300, high_cutoff=3400):
+        self.max_entries = max_entries
+        self.max_bit_error = max_bit_error  # Share of differing bits still counted as a match
+        self.max_shift = max_shift  # Frames two fingerprints may be misaligned by
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.window = np.hanning(frame_size).astype(np.float32)
+        # Log spaced band edges over the speech band, as rfft bin indices
+        freqs = np.fft.rfftfreq(frame_size, 1 / samplerate)
+        edges = np.geomspace(low_cutoff, high_cutoff, bands + 1)
+        self.band_bins = np.searchsorted(freqs, edges)
+        self.entries = OrderedDict()  # id -> entry, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Load the most recently used entries from the cache database."""
+        from app.models.cached_transcription import CachedTranscription
+
+        CachedTranscription._meta.database.create_tables([CachedTranscription], safe=True)
+        query = (CachedTranscription.select()
+                 .order_by(CachedTranscription.used_at.desc())
+                 .limit(self.max_entries))
+        for row in reversed(list(query)):
+            self.entries[row.id] = self.row_entry(row)
+
+    def row_entry(self, row):
+        fingerprint = np.frombuffer(row.fingerprint, dtype=np.uint8).reshape(row.frames, -1)
+        return {
+            "fingerprint": fingerprint,
+            "transcription": row.transcription,
+            "segments": json.loads(row.segments),
+            "score": row.score,
+            "tier": row.tier
+        }
+
+    def fingerprint(self, audio):
+        """Compute the packed fingerprint bits of a mono 16 kHz clip, None if it is too short."""
+        if len(audio) < self.frame_size + 2 * self.hop_size:
+            return None
+        frames = sliding_window_view(audio, self.frame_size)[::self.hop_size] * self.window
+        power = np.abs(np.fft.rfft(frames)) ** 2
+        energy = np.log(np.add.reduceat(power, self.band_bins[:-1], axis=1) + 1e-10)
+        band_diff = np.diff(energy, axis=1)
+        bits = np.diff(band_diff, axis=0) > 0
+        return np.packbits(bits, axis=1)
+
+    def bit_error(self, first, second):
+        """Lowest share of differing bits between two fingerprints over the allowed shifts."""
+        best = 1.0
+        for shift in range(-self.max_shift, self.max_shift + 1):
+            a = first[max(shift, 0):]
+            b = second[max(-shift, 0):]
+            length = min(len(a), len(b))
+            if length == 0:
+                continue
+            differing = np.unpackbits(a[:length] ^ b[:length]).sum()
+            best = min(best, differing / (length * a.shape[1] * 8))
+        return best
+
+    def get(self, fingerprint):
+        """Return the cached entry matching a fingerprint, or None."""
+        if fingerprint is not None:
+            for entry_id, entry in self.entries.items():
+                if abs(len(entry["fingerprint"]) - len(fingerprint)) > self.max_shift:
+                    continue
+                if self.bit_error(entry["fingerprint"], fingerprint) <= self.max_bit_error:
+                    self.hits += 1
+                    self.touch(entry_id)
+                    return entry
+        self.misses += 1
+        return None
+
+    def touch(self, entry_id):
+        """Mark an entry as the most recently used."""
+        from app.models.cached_transcription import CachedTranscription
+
+        self.entries.move_to_end(entry_id)
+        (CachedTranscription.update(used_at=time.time())
+         .where(CachedTranscription.id == entry_id).execute())
+
+    def put(self, fingerprint, clip_data):
+        """Cache the transcription of a clip, evicting the least recently used entries."""
+        from app.models.cached_transcription import CachedTranscription
+
+        if fingerprint is None or np.isnan(clip_data["score"]):
+            return  # Too short to fingerprint, or nothing was transcribed
+        row = CachedTranscription.create(
+            fingerprint=fingerprint.tobytes(),
+            frames=len(fingerprint),
+            transcription=clip_data["transcription"],
+            segments=json.dumps(clip_data.get("segments", [])),
+            score=clip_data["score"],
+            tier=clip_data.get("tier", "full"),
+            used_at=time.time()
+        )
+        self.entries[row.id] = self.row_entry(row)
+        evicted = []
+        while len(self.entries) > self.max_entries:
+            evicted.append(self.entries.popitem(last=False)[0])
+        if evicted:
+            CachedTranscription.delete().where(CachedTranscription.id.in_(evicted)).execute()
+
+    def get_stats(self):
+        """Return the cache hit counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+def transcription_worker(worker_id, jobs, results, model_size, language, cpu_threads, device,
+                         draft_model_size, redecode_threshold, speech_gate, vad_filter, cache_size):
+    """Load a private model and transcribe jobs until a stop sentinel is received.
+
+    Each job is announced with a "started" message before it is transcribed, so the
+    pool knows which clip was lost if the worker dies.
+    """
+    # Imported here so the parent process never loads the model stack for the pool
+    from .speech_2_text import Speech2Text
+    from .transcription_cache import TranscriptionCache
+
+    speech_to_text = Speech2Text(model_size=model_size, language=language, cpu_threads=cpu_threads,
+                                 device=device, draft_model_size=draft_model_size,
+                                 redecode_threshold=redecode_threshold, speech_gate=speech_gate,
+                                 vad_filter=vad_filter,
+                                 cache=TranscriptionCache(cache_size) if cache_size else None)
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        key, clip_path, audio, tags = job
+        results.put(("started", worker_id, key, None))
+        try:
+            clip_data = speech_to_text.transcribe_clip(clip_path, audio=audio)
+            clip_data.update(tags)
+        except Exception as e:
+            print(f"Error transcribing clip {clip_path}: {e}")
+            clip_data = None
+        results.put(("done", worker_id, key, clip_data))
+
+class TranscriptionPool:
+    """Transcribe clips on worker processes that each own a Whisper model.
+
+    Jobs go through one shared queue, and results are delivered to the callback
+    in clip start time order regardless of which worker finishes first. A clip whose
+    worker dies is given up, and the worker replaced, so later clips aren't held back.
+    """
+    def __init__(self, workers=2, cpu_threads=None, model_size=None, language="es", device="auto",
+                 draft_model_size=None, redecode_threshold=0.6, speech_gate=None, vad_filter=False,
+                 cache_size=0, liveness_interval=1.0):
+        self.workers = workers
+        # Split the cores evenly so the workers don't oversubscribe the CPU
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.model_size = model_size
+        self.language = language
+        self.device = device
+        self.draft_model_size = draft_model_size
+        self.redecode_threshold = redecode_threshold
+        self.speech_gate = speech_gate  # Pickled to every worker
+        self.vad_filter = vad_filter
+        self.cache_size = cache_size  # Each worker keeps its own cache over the shared cache database
+        self.liveness_interval = liveness_interval  # Seconds between checks for dead workers
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = {}  # Worker id -> process
+        self.running_jobs = {}  # Worker id -> key of the clip it is transcribing
+        self.worker_ids = itertools.count()
+        self.workers_lock = threading.Lock()
+        self.stopping = False
+        self.collector_thread = None
+        self.lock = threading.Lock()
+        self.pending = []  # Heap of keys submitted and not yet delivered
+        self.finished = {}  # Results waiting for earlier clips to finish
+        self.sequence = itertools.count()
+
+    def start(self, callback):
+        """Spawn the workers and deliver each transcription to callback(clip_data)."""
+        self.callback = callback
+        self.jobs = self.context.Queue()
+        self.results = self.context.Queue()
+        self.stopping = False
+        with self.workers_lock:
+            for _ in range(self.workers):
+                self.start_worker()
+
+        self.collector_thread = threading.Thread(target=self.collect_results, daemon=True)
+        self.collector_thread.start()
+
+    def start_worker(self):
+        """Spawn a worker process, called with workers_lock held."""
+        worker_id = next(self.worker_ids)
+        process = self.context.Process(
+            target=transcription_worker,
+            args=(worker_id, self.jobs, self.results, self.model_size, self.language,
+                  self.cpu_threads, self.device, self.draft_model_size, self.redecode_threshold,
+                  self.speech_gate, self.vad_filter, self.cache_size),
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+
+    def submit(self, clip):
+        """Queue a clip for transcription on the next free worker."""
+        key = (clip["start_time"] or 0.0, next(self.sequence))
+        with self.lock:
+            heapq.heappush(self.pending, key)
+        tags = {"channel": clip["channel"], "clip_id": clip["clip_id"],
+                "started_at": clip["started_at"], "duration": clip["duration"]}
+        self.jobs.put((key, clip["file_path"], clip["audio"], tags))
+
+    def collect_results(self):
+        """Receive results from the workers and release them in start time order."""
+        next_check = time.monotonic() + self.liveness_interval
+        while True:
+            if time.monotonic() >= next_check:
+                self.check_workers()
+                next_check = time.monotonic() + self.liveness_interval
+            try:
+                message = self.results.get(timeout=self.liveness_interval)
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+            state, worker_id, key, clip_data = message
+            if state == "done":
+                with self.workers_lock:
+                    self.running_jobs.pop(worker_id, None)
+                self.release(key, clip_data)
+                continue
+            with self.workers_lock:
+                known = worker_id in self.processes
+                if known:
+                    self.running_jobs[worker_id] = key
+                elif not self.stopping:
+                    self.start_worker()  # Replaces a worker found dead before this arrived
+            if not known:
+                print("Clip lost, its transcription worker died.")
+                self.release(key, None)
+
+    def check_workers(self):
+        """Give up the clips of dead workers, and replace the ones that died on a clip."""
+        lost = []
+        with self.workers_lock:
+            if self.stopping:
+                return
+            for worker_id, process in list(self.processes.items()):
+                if process.is_alive():
+                    continue
+                print(f"Transcription worker {process.pid} exited with code {process.exitcode}.")
+                del self.processes[worker_id]
+                key = self.running_jobs.pop(worker_id, None)
+                if key is not None:
+                    lost.append(key)
+                    self.start_worker()  # The model had loaded, the clip brought the worker down
+            if not self.processes:
+                # Nothing is left to transcribe the queued clips
+                with self.lock:
+                    lost.extend(key for key in self.pending if key not in self.finished)
+        for key in lost:
+            print("Clip lost, its transcription worker died.")
+            self.release(key, None)
+
+    def release(self, key, clip_data):
+        """Record the result of a clip and deliver the ones no earlier clip holds back."""
+        ready = []
+        with self.lock:
+            if key in self.finished or key not in self.pending:
+                return  # Already given up
+            self.finished[key] = clip_data
+            while self.pending and self.pending[0] in self.finished:
+                ready.append(self.finished.pop(heapq.heappop(self.pending)))
+        for clip_data in ready:
+            if clip_data is not None:
+                self.callback(clip_data)
+
+    def stop(self):
+        """Let the workers finish the queued jobs, then shut them down."""
+        with self.workers_lock:
+            self.stopping = True
+            processes = list(self.processes.values())
+        for _ in processes:
+            self.jobs.put(None)
+        for process in processes:
+            process.join()
+        with self.workers_lock:
+            self.processes = {}
+            self.running_jobs = {}
+
+        if self.collector_thread is not None:
+            self.results.put(None)
+            self.collector_thread.join()
+            self.collector_thread = None
@@ -0,0 +1,81 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+class VoiceActivityDetector(ABC):
+    """Strategy used by ClipDivider to decide whether an audio block contains speech."""
+    @abstractmethod
+    def is_speech(self, block):
+        """Return True if the block contains speech."""
+
+class RMSDetector(VoiceActivityDetector):
+    """Speech is any block louder than a fixed RMS threshold."""
+    def __init__(self, threshold=0.01):
+        self.threshold = threshold
+
+    def calculate_rms(self, block):
+        """Calculate the RMS of an audio block without allocating temporaries."""
+        samples = block.reshape(-1)
+        return np.sqrt(np.dot(samples, samples) / samples.size)
+
+    def is_speech(self, block):
+        return self.calculate_rms(block) > self.threshold
+
+class SpectralDetector(VoiceActivityDetector):
+    """Speech band energy against an adaptive noise floor, gated by the zero-crossing rate.
+
+    Squelch tails and static bursts are broadband and cross zero often, so they fail
+    the band ratio and zero-crossing checks even when they are loud.
+    """
+    def __init__(self, samplerate, block_size, low_cutoff=300, high_cutoff=3400, energy_ratio=3.0,
+                 min_band_ratio=0.5, max_zero_crossings=0.25, noise_adaptation=0.05):
+        self.samplerate = samplerate
+        self.low_cutoff = low_cutoff  # Speech band in Hz
+        self.high_cutoff = high_cutoff
+        self.energy_ratio = energy_ratio  # Band energy over the noise floor to count as speech
+        self.min_band_ratio = min_band_ratio  # Share of the block energy inside the speech band
+        self.max_zero_crossings = max_zero_crossings  # Zero crossings per sample
+        self.noise_adaptation = noise_adaptation  # Smoothing factor of the noise floor
+        self.min_noise_floor = 1e-9  # Keeps digital silence from zeroing the floor
+        self.noise_floor = None
+        self.prepare(block_size)
+
+    def prepare(self, block_size):
+        """Precompute the window and speech band bins for a block size."""
+        self.block_size = block_size
+        self.window = np.hanning(block_size).astype(np.float32)
+        freqs = np.fft.rfftfreq(block_size, 1 / self.samplerate)
+        self.band = slice(np.searchsorted(freqs, self.low_cutoff),
+                          np.searchsorted(freqs, self.high_cutoff, side="right"))
+
+    def is_speech(self, block):
+        samples = block[:, 0] if block.ndim > 1 else block
+        if len(samples) != self.block_size:
+            self.prepare(len(samples))
+
+        power = np.abs(np.fft.rfft(samples * self.window)) ** 2
+        total_energy = power.sum() + self.min_noise_floor
+        band_energy = power[self.band].sum()
+        zero_crossings = np.count_nonzero(np.diff(np.signbit(samples))) / len(samples)
+
+        if self.noise_floor is None:
+            self.noise_floor = max(band_energy, self.min_noise_floor)
+            return False
+
+        speech = (band_energy > self.energy_ratio * self.noise_floor
+                  and band_energy / total_energy > self.min_band_ratio
+                  and zero_crossings < self.max_zero_crossings)
+
+        # Track the floor on non-speech blocks, and creep towards louder backgrounds
+        # during speech so a raised noise level doesn't keep a clip open forever
+        adaptation = self.noise_adaptation if not speech else self.noise_adaptation / 1000
+        self.noise_floor += adaptation * (band_energy - self.noise_floor)
+        self.noise_floor = max(self.noise_floor, self.min_noise_floor)
+        return speech
+
+def create_detector(name, samplerate, block_size, **options):
+    """Create the detector selected for a channel by name ("rms" or "spectral")."""
+    if name == "spectral":
+        return SpectralDetector(samplerate, block_size, **options)
+    if name == "rms":
+        return RMSDetector(**options)
+    raise ValueError(f"Unknown voice activity detector: {name}")
@@ -1,10 +1,26 @@
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QLineEdit, QListWidget
-from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QFrame, QPushButton
+from PyQt5.QtWidgets import QTableView, QHeaderView, QFrame, QPushButton
+from PyQt5.QtCore import pyqtSignal, QTimer
+from .transcription_table_model import TranscriptionTableModel
 
 class MainUI(QWidget):
+    # Emitted from the worker threads, delivered on the Qt thread
+    partial_transcription_changed = pyqtSignal(str, str)
+    status_changed = pyqtSignal(str)
+    new_transcription = pyqtSignal(str, str)
+    new_date = pyqtSignal(str)
+    search_page_ready = pyqtSignal(int, list, bool)
+
     def __init__(self):
         super().__init__()
+        self.partial_transcriptions = {}  # Provisional text of the open clip per channel
+        self.partial_transcription_changed.connect(self.update_partial_transcription)
+        self.new_transcription.connect(self.add_transcription)
+        self.new_date.connect(self.insert_date)
+        self.search_page_ready.connect(self.add_search_page)
+        self.search_delay = 300  # Milliseconds without typing before a search runs
+        self.displayed_search = 0  # Generation of the search results on display
 
         # Styling parameters
         self.header_font_size = "18px"
@@ -47,6 +63,7 @@ class MainUI(QWidget):
         
         self.init_search_bar(left_layout)
         self.add_dates_list(left_layout)
+        self.add_partial_transcription_label(right_layout)
         self.add_transcription_table(right_layout)
 
         content_layout.addLayout(left_layout)
@@ -63,6 +80,11 @@ class MainUI(QWidget):
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search...")
         self.search_bar.textChanged.connect(self.search_text_changed)
+        # Restarted on every keystroke, so only a pause in typing runs the search
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.search_delay)
+        self.search_timer.timeout.connect(self.run_search)
         search_layout.addWidget(self.search_bar)
 
         layout.addLayout(search_layout)
@@ -72,18 +94,65 @@ class MainUI(QWidget):
         self.search_callback = search_callback
 
     def search_text_changed(self, text):
-        """Slot method to handle search bar text changes."""
+        """Slot method to handle search bar text changes, debounced by search_timer."""
+        self.search_timer.start()
+
+    def run_search(self):
+        """Slot method to run the search once typing pauses."""
         text = self.search_bar.text().lower()
         self.search_callback(text)
 
+    def show_search_page(self, generation, rows, first):
+        """Show a page of (transcription, time) search results, safe to call from any thread."""
+        self.search_page_ready.emit(generation, rows, first)
+
+    def add_search_page(self, generation, rows, first):
+        """Slot method to append a page of search results below the previous ones."""
+        if generation < self.displayed_search:
+            return  # Results of a search that was replaced
+        if first:
+            self.displayed_search = generation
+            self.transcription_model.reset()
+        elif generation != self.displayed_search:
+            return
+        self.transcription_model.append_rows([(transcription, time, None) for transcription, time in rows])
+
     def add_dates_list(self, layout):
         self.dates_list = QListWidget()
         layout.addWidget(self.dates_list)
         self.dates_list.itemClicked.connect(self.on_date_selected)
 
+    def add_partial_transcription_label(self, layout):
+        """Add the label showing provisional text of clips still being recorded."""
+        self.partial_label = QLabel()
+        self.partial_label.setWordWrap(True)
+        self.partial_label.setStyleSheet("font-style: italic; color: gray;")
+        self.partial_label.hide()
+        layout.addWidget(self.partial_label)
+
+    def show_partial_transcription(self, channel, text):
+        """Show the provisional text of an open clip, safe to call from any thread."""
+        self.partial_transcription_changed.emit(channel, text)
+
+    def clear_partial_transcription(self, channel):
+        """Remove the provisional text of a channel, safe to call from any thread."""
+        self.partial_transcription_changed.emit(channel, "")
+
+    def update_partial_transcription(self, channel, text):
+        """Slot method to refresh the provisional transcriptions label."""
+        if text:
+            self.partial_transcriptions[channel] = text
+        else:
+            self.partial_transcriptions.pop(channel, None)
+        self.partial_label.setText("\n".join(
+            f"🎙 {channel}: {text}…" for channel, text in self.partial_transcriptions.items()
+        ))
+        self.partial_label.setVisible(bool(self.partial_transcriptions))
+
     def add_transcription_table(self, layout):
-        self.transcription_table = QTableWidget(0, 2)
-        self.transcription_table.setHorizontalHeaderLabels(["Transcription", "Time"])
+        self.transcription_model = TranscriptionTableModel(parent=self)
+        self.transcription_table = QTableView()
+        self.transcription_table.setModel(self.transcription_model)
         self.transcription_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.transcription_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
         self.transcription_table.verticalHeader().setVisible(False)
@@ -91,7 +160,15 @@ class MainUI(QWidget):
         layout.addWidget(self.transcription_table)
 
     def clear_transcription_table(self):
-        self.transcription_table.setRowCount(0)
+        self.transcription_model.reset()
+
+    def show_transcription_pages(self, fetch_page, search_generation=0):
+        """List transcriptions paged in from fetch_page(before_key, limit) as the table scrolls.
+
+        Search pages of search_generation or older that arrive afterwards are ignored.
+        """
+        self.displayed_search = max(self.displayed_search, search_generation)
+        self.transcription_model.reset(fetch_page)
 
     def clear_dates_list(self):
         self.dates_list.clear()
@@ -100,11 +177,21 @@ class MainUI(QWidget):
         """Add a date to the dates list."""
         self.dates_list.addItem("📅 " + date_str)
 
+    def insert_date(self, date_str):
+        """Add a date to the top of the dates list."""
+        self.dates_list.insertItem(0, "📅 " + date_str)
+
+    def show_new_date(self, date_str):
+        """Add the date of a new clip to the dates list, safe to call from any thread."""
+        self.new_date.emit(date_str)
+
+    def show_new_transcription(self, transcription, time):
+        """Add a new transcription to the table, safe to call from any thread."""
+        self.new_transcription.emit(transcription, time)
+
     def add_transcription(self, transcription, time):
         """Add a transcription to the top of the transcription table."""
-        self.transcription_table.insertRow(0)
-        self.transcription_table.setItem(0, 0, QTableWidgetItem(transcription))
-        self.transcription_table.setItem(0, 1, QTableWidgetItem(time))
+        self.transcription_model.prepend_row((transcription, time, None))
 
     def add_bottom_record_bar(self, layout):
         """Add a bottom bar with buttons."""
@@ -113,6 +200,7 @@ class MainUI(QWidget):
         # Log text
         self.log_text = QLabel("Log:")
         bottom_bar_layout.addWidget(self.log_text)
+        self.status_changed.connect(self.log_text.setText)
 
         # Record button
         self.record_button = QPushButton("Start Recording")
@@ -134,6 +222,10 @@ class MainUI(QWidget):
         self.log_text.setText("Recording...")
         self.record_button.setEnabled(False)
 
+    def set_status(self, text):
+        """Show a status message in the log, safe to call from any thread."""
+        self.status_changed.emit(text)
+
     def update_header_label(self, date):
         """Update the header label with the current date."""
         self.header_label.setText(f"Current Date: {date}")
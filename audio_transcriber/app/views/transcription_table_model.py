@@ -0,0 +1,78 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+class TranscriptionTableModel(QAbstractTableModel):
+    """Transcriptions table, newest on top, holding (transcription, time, key) tuples.
+
+    Rows come from a fetch_page(before_key, limit) callback as the view scrolls, newest
+    first, and clips arriving live are kept in their own list shown above them, so adding
+    one never shifts the stored rows.
+    """
+    headers = ["Transcription", "Time"]
+
+    def __init__(self, page_size=200, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.live = []  # Rows added after the listing started, oldest first
+        self.paged = []  # Rows fetched from the database, newest first
+        self.fetch_page = None
+        self.exhausted = True
+
+    def reset(self, fetch_page=None):
+        """Empty the table, then page rows in from fetch_page if given."""
+        self.beginResetModel()
+        self.live = []
+        self.paged = []
+        self.fetch_page = fetch_page
+        self.exhausted = fetch_page is None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.live) + len(self.paged)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def row(self, index):
+        if index < len(self.live):
+            return self.live[-1 - index]
+        return self.paged[index - len(self.live)]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self.row(index.row())[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Append the next page of older rows."""
+        before = self.paged[-1][2] if self.paged else None
+        rows = self.fetch_page(before, self.page_size)
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        self.append_rows(rows)
+
+    def append_rows(self, rows):
+        """Add rows below the current ones."""
+        if not rows:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.paged.extend(rows)
+        self.endInsertRows()
+
+    def prepend_row(self, row):
+        """Add a live row on top."""
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.live.append(row)
+        self.endInsertRows()
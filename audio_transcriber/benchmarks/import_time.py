@@ -0,0 +1,63 @@
+"""Import-time benchmark for the transcription startup path.
+
+Run from the audio_transcriber directory:
+
+    python benchmarks/import_time.py [--budget SECONDS]
+
+Every step runs in a fresh interpreter. The script exits with an error if any
+step imports torch or takes longer than its budget, so it can guard CI against
+startup regressions.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, code run in a fresh interpreter, default budget in seconds)
+STEPS = [
+    ("import speech_2_text", "import app.services.speech_2_text", 0.5),
+    ("import faster_whisper", "import faster_whisper", 3.0),
+    ("detect device", "from app.services.speech_2_text import Speech2Text; Speech2Text.detect_device()", 3.0),
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - start, "torch": "torch" in sys.modules}))
+"""
+
+def run_step(code):
+    """Time a snippet in a fresh interpreter, returning its timing and whether torch was loaded."""
+    output = subprocess.run([sys.executable, "-c", PROBE, code], cwd=APP_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=None,
+                        help="override the time budget of every step, in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per step, the best one counts")
+    args = parser.parse_args()
+
+    failures = []
+    for name, code, budget in STEPS:
+        budget = args.budget if args.budget is not None else budget
+        results = [run_step(code) for _ in range(args.repeat)]
+        seconds = min(result["seconds"] for result in results)
+        imported_torch = any(result["torch"] for result in results)
+        print(f"{name:<24} {seconds:7.3f}s  budget {budget:.1f}s  torch: {'yes' if imported_torch else 'no'}")
+        if imported_torch:
+            failures.append(f"{name} imported torch")
+        if seconds > budget:
+            failures.append(f"{name} took {seconds:.3f}s, over the {budget:.1f}s budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
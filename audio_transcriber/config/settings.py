@@ -0,0 +1,39 @@
+# Database
+DATABASE_PATH = 'radio_transcriber.db'
+CACHE_DATABASE_PATH = 'transcription_cache.db'  # Transcription cache, next to the main database
+DATABASE_BUSY_TIMEOUT = 5  # Seconds a connection waits for a lock before failing
+DATABASE_PRAGMAS = {
+    "journal_mode": "wal",  # Readers don't block the writer and the writer doesn't block them
+    "synchronous": 1,  # NORMAL, with WAL only a power loss can lose the last commits
+    "cache_size": -64000,  # Page cache in KiB (64 MB) per connection
+    "mmap_size": 256 * 1024 * 1024,  # Read pages through a memory map
+    "foreign_keys": 1,
+}
+
+# Transcription
+TRANSCRIPTION_DEVICE = "auto"  # "cpu", "cuda" or "auto" to use a GPU when CTranslate2 finds one
+TRANSCRIPTION_WORKERS = 0  # Worker processes with their own model, 0 transcribes in-process
+TRANSCRIPTION_CPU_THREADS = None  # CPU threads pinned per worker model, None splits the cores evenly
+DRAFT_MODEL = "small"  # Fast model tried first, None sends every clip straight to large-v3
+REDECODE_THRESHOLD = 0.6  # Draft transcriptions scoring below this are re-decoded with large-v3
+SPEECH_GATE = True  # Trim the silence around each clip with Silero VAD before transcribing it
+MIN_SPEECH_RATIO = 0.1  # Clips with less speech than this share are skipped and only recorded
+WHISPER_VAD_FILTER = False  # Also run Whisper's VAD filter on clips decoded one at a time
+TRANSCRIPTION_CACHE_SIZE = 512  # Transcriptions kept for repeated audio, 0 disables the cache
+PARTIAL_INTERVAL = 3  # Seconds between provisional transcriptions of an open clip, None disables them
+PARTIAL_WINDOW = 10  # Seconds of audio in each provisional transcription window
+
+# Audio channels, each one gets its own input and clip divider.
+# source is "device" (sound card), "file" (16-bit WAV file) or "tcp_iq" (rtl_tcp server),
+# vad picks the voice activity detector: "rms" (fixed threshold) or "spectral", and
+# bandpass filters the audio (80-2000 Hz) before detection and clipping.
+# The remaining keys are passed to AudioInput, FileAudioInput or TcpIqInput. Audio is
+# captured at 16 kHz, the rate Whisper consumes; devices that don't support it can set
+# "capture_samplerate": 48000 to be decimated in-stream instead.
+CHANNELS = [
+    {"name": "default", "source": "device", "device": None, "samplerate": 16000,
+     "vad": "rms", "bandpass": False},
+    # {"name": "marine16", "source": "tcp_iq", "host": "127.0.0.1", "port": 1234,
+    #  "center_freq": 156_800_000, "vad": "spectral"},
+    # {"name": "replay", "source": "file", "file_path": "recording.wav"},
+]
@@ -1,20 +1,133 @@
+import datetime
+import time
 from peewee import SqliteDatabase
+from playhouse.migrate import SqliteMigrator, migrate, make_index_name
+from config import settings
 
-# Initialize the database connection
-db = SqliteDatabase('radio_transcriber.db')
+# Initialize the database connection. Peewee keeps one connection per thread, the
+# DatabaseWriter thread does the writes and WAL lets the UI read while it commits.
+db = SqliteDatabase(settings.DATABASE_PATH, pragmas=settings.DATABASE_PRAGMAS,
+                    timeout=settings.DATABASE_BUSY_TIMEOUT)
+# Transcriptions reused for repeated audio, kept apart so the cache can be deleted freely
+cache_db = SqliteDatabase(settings.CACHE_DATABASE_PATH, pragmas=settings.DATABASE_PRAGMAS,
+                          timeout=settings.DATABASE_BUSY_TIMEOUT)
 
 def initialize_db():
     # Import models here to avoid circular imports
     from app.models.admin_user import AdminUser
     from app.models.audio_clip import AudioClip
+    from app.models.clip_segment import ClipSegment
+    from app.models.audio_clip_index import AudioClipIndex
+    from app.models.clip_day_summary import ClipDaySummary
 
     # Connect to the database
     db.connect()
     
-    # Create tables
-    db.create_tables([AdminUser, AudioClip], safe=True)
+    # Add the missing columns first, the indexes created with the tables may refer to them
+    models = [AdminUser, AudioClip, ClipSegment, ClipDaySummary]
+    summarized = ClipDaySummary.table_exists()
+    migrate_db(models)
+    db.create_tables(models, safe=True)
+    backfill_started_at()
+    index_db(AudioClipIndex)
+    if not summarized:
+        summarize_db()
+
+def migrate_db(models):
+    """Add the columns of fields introduced after the database was created."""
+    migrator = SqliteMigrator(db)
+    operations = []
+    for model in models:
+        if not model.table_exists():
+            continue  # Created from scratch with every column
+        table = model._meta.table_name
+        columns = {column.name for column in db.get_columns(table)}
+        for field in model._meta.sorted_fields:
+            if field.column_name not in columns:
+                if field.index or field.unique:
+                    # Built on a constant by an earlier create_tables run, before the column existed
+                    db.execute_sql(f'DROP INDEX IF EXISTS "{make_index_name(table, [field.column_name])}"')
+                operations.append(migrator.add_column(table, field.column_name, field))
+    if operations:
+        migrate(*operations)
+
+def backfill_started_at():
+    """Fill started_at of clips stored before it existed from their local date and start time."""
+    rows = db.execute_sql("SELECT id, date, time_start FROM audioclip WHERE started_at IS NULL").fetchall()
+    if not rows:
+        return
+    with db.atomic():
+        for clip_id, date, time_start in rows:
+            try:
+                started = datetime.datetime.strptime(f"{date} {time_start}", "%Y/%m/%d %H:%M:%S")
+            except ValueError:
+                print(f"Clip {clip_id} has no readable date, its start timestamp stays empty.")
+                continue
+            db.execute_sql("UPDATE audioclip SET started_at = ? WHERE id = ?",
+                           (int(started.timestamp() * 1_000_000), clip_id))
+    print(f"Filled the start timestamp of {len(rows)} clips.")
+
+def index_db(index):
+    """Create the full-text index with its sync triggers, filling it from the existing clips."""
+    if index.table_exists():
+        return
+    with db.atomic():
+        index.create_table()
+        for event, statements in (
+            ("INSERT", "INSERT INTO audioclipindex(rowid, transcription) VALUES (new.id, new.transcription);"),
+            ("DELETE", "INSERT INTO audioclipindex(audioclipindex, rowid, transcription) "
+                       "VALUES ('delete', old.id, old.transcription);"),
+            ("UPDATE OF transcription",
+             "INSERT INTO audioclipindex(audioclipindex, rowid, transcription) "
+             "VALUES ('delete', old.id, old.transcription); "
+             "INSERT INTO audioclipindex(rowid, transcription) VALUES (new.id, new.transcription);"),
+        ):
+            name = "audioclip_" + event.split()[0].lower() + "_index"
+            db.execute_sql(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON audioclip "
+                           f"BEGIN {statements} END;")
+        index.rebuild()
+
+def summarize_db():
+    """Create the triggers maintaining ClipDaySummary and fill it from the existing clips."""
+    with db.atomic():
+        db.execute_sql(
+            "CREATE TRIGGER IF NOT EXISTS audioclip_insert_summary AFTER INSERT ON audioclip "
+            "WHEN NOT new.skipped BEGIN "
+            "INSERT INTO clipdaysummary(admin_user_id, date, clip_count, total_duration, total_score) "
+            "VALUES (new.admin_user_id, new.date, 1, new.duration, new.score) "
+            "ON CONFLICT(admin_user_id, date) DO UPDATE SET "
+            "clip_count = clip_count + 1, total_duration = total_duration + excluded.total_duration, "
+            "total_score = total_score + excluded.total_score; END;"
+        )
+        db.execute_sql(
+            "CREATE TRIGGER IF NOT EXISTS audioclip_delete_summary AFTER DELETE ON audioclip "
+            "WHEN NOT old.skipped BEGIN "
+            "UPDATE clipdaysummary SET clip_count = clip_count - 1, "
+            "total_duration = total_duration - old.duration, total_score = total_score - old.score "
+            "WHERE admin_user_id = old.admin_user_id AND date = old.date; "
+            "DELETE FROM clipdaysummary WHERE admin_user_id = old.admin_user_id AND date = old.date "
+            "AND clip_count <= 0; END;"
+        )
+        db.execute_sql("DELETE FROM clipdaysummary")
+        db.execute_sql(
+            "INSERT INTO clipdaysummary(admin_user_id, date, clip_count, total_duration, total_score) "
+            "SELECT admin_user_id, date, COUNT(*), SUM(duration), SUM(score) FROM audioclip "
+            "WHERE NOT skipped GROUP BY admin_user_id, date"
+        )
+
+def check_db():
+    """Probe the connection of the calling thread, returning its health and round trip latency."""
+    start = time.perf_counter()
+    try:
+        journal_mode = db.execute_sql('PRAGMA journal_mode').fetchone()[0]
+        db.execute_sql('SELECT 1').fetchone()
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latency_ms": (time.perf_counter() - start) * 1000}
+    return {"ok": True, "journal_mode": journal_mode, "latency_ms": (time.perf_counter() - start) * 1000}
 
 def close_db():
     if not db.is_closed():
         db.close()
+    if not cache_db.is_closed():
+        cache_db.close()
 
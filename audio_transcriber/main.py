@@ -1,25 +1,47 @@
-from data.database import initialize_db, close_db
+from data.database import initialize_db, close_db, check_db
 from app.controllers.admin_user_controller import AdminUserController
 from app.controllers.audio_clip_controller import AudioClipController
 from app.services.audio_input import AudioInput
+from app.services.file_input import FileAudioInput
+from app.services.tcp_iq_input import TcpIqInput
 from app.services.clip_divider import ClipDivider
+from app.services.voice_activity import create_detector
 from app.services.speech_2_text import Speech2Text
 from app.services.audio_processor import AudioProcessor
+from app.services.transcription_pool import TranscriptionPool
+from app.services.speech_gate import SpeechGate
+from app.services.transcription_cache import TranscriptionCache
+from config import settings
 from PyQt5.QtWidgets import QApplication
 from app.views.main_ui import MainUI
 import sys
 
+def create_channel(config):
+    """Create the audio input and clip divider of a channel from settings.CHANNELS."""
+    options = {key: value for key, value in config.items()
+               if key not in ("name", "source", "vad", "bandpass")}
+    if config["source"] == "file":
+        audio_input = FileAudioInput(**options)
+    elif config["source"] == "tcp_iq":
+        audio_input = TcpIqInput(**options)
+    else:
+        audio_input = AudioInput(**options)
+    vad = create_detector(config.get("vad", "rms"), audio_input.samplerate, audio_input.blocksize)
+    clip_divider = ClipDivider(samplerate=audio_input.samplerate, block_size=audio_input.blocksize,
+                               channels=audio_input.channels, channel=config["name"], vad=vad,
+                               bandpass=config.get("bandpass", False),
+                               partial_interval=settings.PARTIAL_INTERVAL,
+                               partial_window=settings.PARTIAL_WINDOW)
+    return audio_input, clip_divider
+
 def main():
     # Initialize the database
     initialize_db()
+    health = check_db()
+    print(f"Database {'ready' if health['ok'] else 'unavailable'}: {health}")
 
-    # Initialize the audio input and clip divider classes
-    print("Initializing models...")
-    audio_input = AudioInput()
-    clip_divider = ClipDivider()
-    speech2text = Speech2Text()
+    # Start the UI first, the model is loaded in the background once it is shown
     print("Preparing the UI...")
-    # Start the UI
     app = QApplication(sys.argv)
     ui = MainUI()
 
@@ -31,21 +53,61 @@ def main():
 
     clip_controller = AudioClipController(user_controller.get_admin_user(user_id=1), ui)
 
-    # Create the main audio processor
+    # Initialize the audio input and clip divider classes
+    channels = [create_channel(config) for config in settings.CHANNELS]
+    speech_gate = SpeechGate(min_speech_ratio=settings.MIN_SPEECH_RATIO) if settings.SPEECH_GATE else None
+    if settings.TRANSCRIPTION_WORKERS > 0:
+        # Each worker process loads its own model, so none is needed here
+        speech2text = None
+        transcription_pool = TranscriptionPool(workers=settings.TRANSCRIPTION_WORKERS,
+                                               cpu_threads=settings.TRANSCRIPTION_CPU_THREADS,
+                                               device=settings.TRANSCRIPTION_DEVICE,
+                                               draft_model_size=settings.DRAFT_MODEL,
+                                               redecode_threshold=settings.REDECODE_THRESHOLD,
+                                               speech_gate=speech_gate,
+                                               vad_filter=settings.WHISPER_VAD_FILTER,
+                                               cache_size=settings.TRANSCRIPTION_CACHE_SIZE)
+    else:
+        # A second model worker runs the partial transcriptions next to the final ones
+        speech2text = Speech2Text(num_workers=2 if settings.PARTIAL_INTERVAL else 1, lazy=True,
+                                  device=settings.TRANSCRIPTION_DEVICE,
+                                  draft_model_size=settings.DRAFT_MODEL,
+                                  redecode_threshold=settings.REDECODE_THRESHOLD,
+                                  speech_gate=speech_gate,
+                                  vad_filter=settings.WHISPER_VAD_FILTER,
+                                  cache=TranscriptionCache(settings.TRANSCRIPTION_CACHE_SIZE)
+                                  if settings.TRANSCRIPTION_CACHE_SIZE else None)
+        transcription_pool = None
+
+    # Create the main audio processor, all channels share the transcription backend
+    audio_input, clip_divider = channels[0]
     audio_processor = AudioProcessor(audio_input, clip_divider, speech2text, 
-                                    user_controller, clip_controller)
-    clip_divider.add_observer(audio_processor)
+                                    user_controller, clip_controller,
+                                    transcription_pool=transcription_pool,
+                                    partial_transcriptions=settings.PARTIAL_INTERVAL is not None)
+    for audio_input, clip_divider in channels[1:]:
+        audio_processor.add_channel(audio_input, clip_divider)
 
     # Set the callbacks
     ui.set_record_button_callback(audio_processor.start)
     ui.set_stop_button_callback(audio_processor.stop)
     
     ui.show()
-    print("All set!")
-
     clip_controller.show_start_data()
 
+    # Clips recorded before the model is ready stay queued in the audio processor
+    print("Initializing models...")
+    if speech2text is not None:
+        ui.set_status("Loading transcription model...")
+        speech2text.load_async(lambda state: ui.set_status(
+            "Transcription model ready." if state == "ready" else "Transcription model failed to load."
+        ))
+    audio_processor.start_transcription()
+    print("All set!")
+
     if sys.flags.interactive != 1:
+        app.aboutToQuit.connect(audio_processor.shutdown)
+        app.aboutToQuit.connect(clip_controller.stop)
         app.aboutToQuit.connect(close_db)
         sys.exit(app.exec_())
 